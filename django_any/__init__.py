@@ -1,4 +1,4 @@
 # -*- coding: utf-8 -*-
 from django_any.forms import any_form_field, any_form
-from django_any.models import any_field, any_model
-
+from django_any.models import any_field, any_model, any_models, iter_any_model, \
+    batch
@@ -1,7 +1,20 @@
 # -*- coding: utf-8 -*-
+import operator
 from django.contrib.auth.models import User, Permission, Group
+from django.db.models import Q
 from django_any import any_model
 
+
+def _lookup_all(model_cls, names, lookups):
+    """
+    Fetches objects for all lookups with single query
+    """
+    result = list(model_cls.objects.filter(reduce(operator.or_, lookups)))
+    if len(result) < len(set(names)):
+        raise model_cls.DoesNotExist("Some of %s does not exist" % ', '.join(names))
+    return result
+
+
 def any_user(password=None, permissions=[], groups=[], **kwargs):
     """
     Shortcut for creating Users
@@ -10,7 +23,16 @@ def any_user(password=None, permissions=[], groups=[], **kwargs):
 
     If not specified, creates active, non superuser 
     and non staff user
+
+    With unsaved=True user is only built, without db access
     """
+    if kwargs.get('unsaved') and (permissions or groups):
+        raise TypeError("Unsaved user can't have permissions or groups")
+
+    if password:
+        holder = User()
+        holder.set_password(password)
+        kwargs['password'] = holder.password
 
     is_active = kwargs.pop('is_active', True)
     is_superuser = kwargs.pop('is_superuser', False)
@@ -19,20 +41,16 @@ def any_user(password=None, permissions=[], groups=[], **kwargs):
     user = any_model(User, is_active = is_active, is_superuser = is_superuser,
                      is_staff = is_staff, **kwargs)
 
-    for group_name in groups :
-        group = Group.objects.get(name=group_name)
-        user.groups.add(group)
+    if groups:
+        user.groups.add(*_lookup_all(Group, groups,
+                                     [Q(name=group_name) for group_name in groups]))
 
-    for permission_name in permissions:
-        app_label, codename = permission_name.split('.')
-        permission = Permission.objects.get(
-            content_type__app_label=app_label,
-            codename=codename)
-        user.user_permissions.add(permission)
+    if permissions:
+        lookups = []
+        for permission_name in permissions:
+            app_label, codename = permission_name.split('.')
+            lookups.append(Q(content_type__app_label=app_label, codename=codename))
+        user.user_permissions.add(*_lookup_all(Permission, permissions, lookups))
 
-    if password:
-        user.set_password(password)
-    
-    user.save()
     return user
 
@@ -4,13 +4,13 @@
 Django forms data generators
 
 """
-import random
+import random, sys
 from datetime import date, datetime, time
 from django import forms
 from django.utils import formats
 from django_any import xunit
-from django_any.functions import valid_choices, split_model_kwargs, \
-    ExtensionMethod
+from django_any.functions import choice_keys, choice_sampler, \
+    split_model_kwargs, field_range, validator_bounds, ExtensionMethod
 
 any_form = ExtensionMethod()
 any_form_field = ExtensionMethod()
@@ -35,7 +35,26 @@ def any_form_default(form_cls, **kwargs):
     return form_data, form_files
 
 
-@any_form_field.decorator
+@any_form_field.decorator(when=lambda field, kwargs: 'regex' in kwargs or \
+                              xunit.regex_supported(validator_bounds(field).get('regex')))
+def field_regex_attribute(function):
+    """
+    Returns string matching `regex` argument or custom field RegexValidator
+
+    >>> import re
+    >>> result = any_form_field(forms.RegexField(r'^[A-Z]{2}\d{4}$'))
+    >>> re.match(r'^[A-Z]{2}\d{4}$', result) is not None
+    True
+    """
+    def _wrapper(field, **kwargs):
+        regex = kwargs.get('regex') or validator_bounds(field)['regex']
+        max_length = getattr(field, 'max_length', None)
+        _, max_length = field_range(field, kwargs, 'length', 0, max_length or sys.maxint)
+        return xunit.any_regex_string(regex, max_length=max_length)
+    return _wrapper
+
+
+@any_form_field.decorator(when=lambda field, kwargs: not field.required)
 def field_required_attribute(function):
     """
     Sometimes return None if field is not required
@@ -45,21 +64,24 @@ def field_required_attribute(function):
     True
     """
     def _wrapper(field, **kwargs):
-        if not field.required and random.random < 0.1:
+        if random.random < 0.1:
             return None
         return function(field, **kwargs)
     return _wrapper
 
 
-@any_form_field.decorator
+@any_form_field.decorator(when=lambda field, kwargs: hasattr(field.widget, 'choices'))
 def field_choices_attibute(function):
     """
-    Selection from field.choices
+    Selection from field.choices, `distribution` argument
+    is the same as for models choices
     """
     def _wrapper(field, **kwargs):
-        if hasattr(field.widget, 'choices'):
-            return random.choice(list(valid_choices(field.widget.choices)))
-        return function(field, **kwargs)
+        keys = choice_keys(field.widget, field.widget.choices)
+        sampler = choice_sampler(field.widget, keys, kwargs.get('distribution'))
+        if sampler is None:
+            return keys[xunit.any_index(len(keys))]
+        return keys[sampler.sample()]
 
     return _wrapper
 
@@ -84,10 +106,8 @@ def char_field_data(field, **kwargs):
     >>> type(result)
     <type 'str'>
     """
-    min_length = kwargs.get('min_length', 1)
-    max_length = kwargs.get('max_length', field.max_length or 255)    
-    return xunit.any_string(min_length=field.min_length or min_length, 
-                            max_length=field.max_length or max_length)
+    min_length, max_length = field_range(field, kwargs, 'length', 1, 255)
+    return xunit.any_string(min_length=min_length, max_length=max_length)
 
 
 @any_form_field.register(forms.DecimalField)
@@ -102,22 +122,10 @@ def decimal_field_data(field, **kwargs):
     >>> Decimal(result) >= 11, Decimal(result) <= Decimal('99.99')
     (True, True)
     """
-    min_value = 0
-    max_value = 10
-    from django.core.validators import MinValueValidator, MaxValueValidator 
-    for elem in field.validators:
-        if isinstance(elem, MinValueValidator):
-            min_value = elem.limit_value
-        if isinstance(elem, MaxValueValidator):
-            max_value = elem.limit_value
+    min_value, max_value = field_range(field, kwargs, 'value', 0, 10)
     if (field.max_digits and field.decimal_places):
-        from decimal import Decimal
         max_value = min(max_value,
-                        Decimal('%s.%s' % ('9'*(field.max_digits-field.decimal_places),
-                                           '9'*field.decimal_places)))
-
-    min_value = kwargs.get('min_value') or min_value
-    max_value = kwargs.get('max_value') or max_value
+                        xunit.max_decimal(field.max_digits, field.decimal_places))
 
     return str(xunit.any_decimal(min_value=min_value,
                              max_value=max_value,
@@ -159,7 +167,7 @@ def date_field_data(field, **kwargs):
     from_date = kwargs.get('from_date', date(1990, 1, 1))
     to_date = kwargs.get('to_date', date.today())
     
-    date_format = random.choice(field.input_formats or formats.get_format('DATE_INPUT_FORMATS'))
+    date_format = xunit.get_rng().choice(field.input_formats or formats.get_format('DATE_INPUT_FORMATS'))
                                 
     return xunit.any_date(from_date=from_date, to_date=to_date).strftime(date_format)
 
@@ -175,7 +183,7 @@ def datetime_field_data(field, **kwargs):
     """
     from_date = kwargs.get('from_date', datetime(1990, 1, 1))
     to_date = kwargs.get('to_date', datetime.today())
-    date_format = random.choice(field.input_formats or formats.get_format('DATETIME_INPUT_FORMATS'))
+    date_format = xunit.get_rng().choice(field.input_formats or formats.get_format('DATETIME_INPUT_FORMATS'))
     return xunit.any_datetime(from_date=from_date, to_date=to_date).strftime(date_format)
 
 
@@ -190,17 +198,7 @@ def float_field_data(field, **kwargs):
     >>> float(result) >=100, float(result) <=200
     (True, True)
     """
-    min_value = 0
-    max_value = 100
-    from django.core.validators import MinValueValidator, MaxValueValidator
-    for elem in field.validators:
-        if isinstance(elem, MinValueValidator):
-            min_value = elem.limit_value
-        if isinstance(elem, MaxValueValidator):
-            max_value = elem.limit_value
-
-    min_value = kwargs.get('min_value', min_value)
-    max_value = kwargs.get('max_value', max_value)
+    min_value, max_value = field_range(field, kwargs, 'value', 0, 100)
     precision = kwargs.get('precision', 3)
 
     return str(xunit.any_float(min_value=min_value, max_value=max_value, precision=precision))
@@ -217,17 +215,7 @@ def integer_field_data(field, **kwargs):
     >>> int(result) >=100, int(result) <=200
     (True, True)
     """
-    min_value = 0
-    max_value = 100
-    from django.core.validators import MinValueValidator, MaxValueValidator 
-    for elem in field.validators:
-        if isinstance(elem, MinValueValidator):
-            min_value = elem.limit_value
-        if isinstance(elem, MaxValueValidator):
-            max_value = elem.limit_value
-
-    min_value = kwargs.get('min_value', min_value)
-    max_value = kwargs.get('max_value', max_value)
+    min_value, max_value = field_range(field, kwargs, 'value', 0, 100)
 
     return str(xunit.any_int(min_value=min_value, max_value=max_value))
 
@@ -247,7 +235,7 @@ def ipaddress_field_data(field, **kwargs):
     """
     choices = kwargs.get('choices')
     if choices:
-        return random.choice(choices)
+        return xunit.get_rng().choice(choices)
     else:
         nums = [str(xunit.any_int(min_value=0, max_value=255)) for _ in xrange(0, 4)]
         return ".".join(nums)
@@ -264,7 +252,7 @@ def null_boolean_field_data(field, **kwargs):
     >>> result in [u'1', u'2', u'3']
     True
     """
-    return random.choice(['None', 'True', 'False'])
+    return xunit.get_rng().choice(['None', 'True', 'False'])
 
 
 @any_form_field.register(forms.SlugField)
@@ -309,7 +297,7 @@ def url_field_data(field, **kwargs):
                        'http://72.14.221.99',
                        'http://fr.wikipedia.org/wiki/France'])
 
-    return random.choice(urls)
+    return xunit.get_rng().choice(urls)
 
 
 @any_form_field.register(forms.TimeField)
@@ -321,7 +309,7 @@ def time_field_data(field, **kwargs):
     >>> type(result)
     <type 'str'>
     """
-    time_format = random.choice(field.input_formats or formats.get_format('TIME_INPUT_FORMATS'))
+    time_format = xunit.get_rng().choice(field.input_formats or formats.get_format('TIME_INPUT_FORMATS'))
 
     return time(xunit.any_int(min_value=0, max_value=23),
                 xunit.any_int(min_value=0, max_value=59),
@@ -345,7 +333,7 @@ def choice_field_data(field, **kwargs):
     True
     """
     if field.choices:
-        return str(random.choice(list(valid_choices(field.choices))))
+        return str(xunit.get_rng().choice(choice_keys(field, field.choices)))
     return 'None'
 
 
@@ -360,14 +348,9 @@ def multiple_choice_field_data(field, **kwargs):
     <type 'str'>
     """
     if field.choices:
-        from django_any.functions import valid_choices 
-        l = list(valid_choices(field.choices))
-        random.shuffle(l)
-        choices = []
-        count = xunit.any_int(min_value=1, max_value=len(field.choices))
-        for i in xrange(0, count):
-            choices.append(l[i])
-        return ' '.join(choices)
+        keys = choice_keys(field, field.choices)
+        count = xunit.any_int(min_value=1, max_value=len(keys))
+        return ' '.join(xunit.get_rng().sample(keys, count))
     return 'None'
 
 
@@ -378,7 +361,7 @@ def model_choice_field_data(field, **kwargs):
     """
     data = list(field.queryset[:10])
     if data:
-        return random.choice(data)
+        return xunit.get_rng().choice(data)
     else:
         raise TypeError('No %s available in queryset' % field.queryset.model)
 
@@ -2,6 +2,10 @@
 """
 Additional functions for django-any
 """
+import threading
+from copy import copy
+from django_any import xunit
+
 
 def valid_choices(choices):
     """
@@ -15,6 +19,53 @@ def valid_choices(choices):
             yield key
 
 
+def choice_keys(owner, choices):
+    """
+    Return list of choices's keys, cached on the owner object
+    (field or widget) until choices are reassigned.
+
+    Lazy iterators, as ModelChoiceIterator, are never cached
+    """
+    if not isinstance(choices, (list, tuple)):
+        return list(valid_choices(choices))
+
+    cached = owner.__dict__.get('_django_any_choices')
+    if cached is not None and cached[0] is choices:
+        return cached[1]
+
+    keys = list(valid_choices(choices))
+    owner.__dict__['_django_any_choices'] = (choices, keys)
+    return keys
+
+
+def choice_distribution(keys, distribution):
+    """
+    Converts explicit {choice: weight} distribution to weights list
+    """
+    if isinstance(distribution, dict):
+        return tuple([distribution.get(key, 0) for key in keys])
+    return distribution
+
+
+def choice_sampler(owner, keys, distribution):
+    """
+    Returns WeightedSampler for choices keys distribution, or None
+    for uniform one. Sampler is cached on the owner object, next to
+    choice_keys, until keys or distribution are changed
+    """
+    if distribution is None:
+        return None
+
+    cached = owner.__dict__.get('_django_any_sampler')
+    if cached is not None and cached[0] is keys and cached[1] == distribution:
+        return cached[2]
+
+    sampler = xunit.distribution_sampler(len(keys), choice_distribution(keys, distribution))
+    # copy, so in place changes of the distribution are noticed
+    owner.__dict__['_django_any_sampler'] = (keys, copy(distribution), sampler)
+    return sampler
+
+
 def split_model_kwargs(kw):
     """
     django_any birds language parser
@@ -34,15 +85,98 @@ def split_model_kwargs(kw):
     return model_fields, fields_agrs
 
 
+def validator_bounds(field):
+    """
+    Return dict of min_value, max_value, min_length and max_length
+    limits, and custom RegexValidator regex, found in field validators.
+
+    Result is cached on the field until validators list changed
+    """
+    from django.core import validators
+
+    cached = field.__dict__.get('_django_any_bounds')
+    if cached is not None and cached[0] is field.validators \
+            and cached[1] == len(field.validators):
+        return cached[2]
+
+    limits = [(validators.MinValueValidator, 'min_value', max),
+              (validators.MaxValueValidator, 'max_value', min),
+              (validators.MinLengthValidator, 'min_length', max),
+              (validators.MaxLengthValidator, 'max_length', min)]
+
+    bounds = {}
+    for validator in field.validators:
+        if isinstance(validator, validators.RegexValidator) and \
+                not isinstance(validator, (validators.URLValidator, validators.EmailValidator)) and \
+                validator not in field.default_validators:
+            bounds.setdefault('regex', validator.regex)
+
+        for validator_cls, name, tightest in limits:
+            if isinstance(validator, validator_cls):
+                if name in bounds:
+                    bounds[name] = tightest(bounds[name], validator.limit_value)
+                else:
+                    bounds[name] = validator.limit_value
+
+    field.__dict__['_django_any_bounds'] = (field.validators, len(field.validators), bounds)
+    return bounds
+
+
+def field_range(field, kwargs, kind, default_min, default_max):
+    """
+    Returns (min, max) interval for the field `value` or `length`.
+
+    Explicit min_/max_ kwargs have first priority, field validators
+    limits the second, and the defaults are used for the rest
+    """
+    bounds = validator_bounds(field)
+    min_name, max_name = 'min_%s' % kind, 'max_%s' % kind
+
+    low = kwargs.get(min_name, bounds.get(min_name))
+    high = kwargs.get(max_name, bounds.get(max_name))
+
+    # defaults shifted to the validated interval
+    if high is None:
+        high = default_max
+        if low > high:
+            high = low + default_max - default_min
+    if low is None:
+        low = default_min
+        if low > high:
+            low = high - default_max + default_min
+    return low, high
+
+
 class ExtensionMethod(object):
     """
     Works like one parameter multimethod
+
+    Tables are never changed in place, registrations and dispatch
+    memoization replace them under the lock, so generation could run
+    from many threads. Compiled pipelines caches are filled without
+    the lock, by single item stores, racing readers could only compile
+    the same pipeline twice
     """
     def __init__(self, by_instance=False):
+        self.lock = threading.RLock()
         self.registry = {}
+        self.dispatch = {}
+        self.decorators = []
+        self.listeners = []
         self.by_instance = by_instance
         self.default = None
 
+        # compiled pipelines are cached on the field objects
+        # and valid while generation not changed
+        self.generation = 0
+        self.compiled = {}
+        self.cache_attr = '_django_any_compiled_%x' % id(self)
+
+    def _changed(self):
+        # readers take the cache first, and tables after it
+        self.generation += 1
+        self.compiled = {}
+
     def register(self, field_type, impl=None):
         """
         Register form field data function.
@@ -50,7 +184,17 @@ class ExtensionMethod(object):
         Could be used as decorator
         """
         def _wrapper(func):
-            self.registry[field_type] = func
+            with self.lock:
+                registry = dict(self.registry)
+                registry[field_type] = func
+                self.registry = registry
+                dispatch = self.dispatch.copy()
+                self.dispatch = dict([(cached_type, function) \
+                                      for cached_type, function in dispatch.iteritems() \
+                                      if not issubclass(cached_type, field_type)])
+                self._changed()
+                for listener in self.listeners:
+                    listener(field_type)
             return func
 
         if impl:
@@ -58,38 +202,136 @@ class ExtensionMethod(object):
         return _wrapper
     
     def register_default(self, func):
-        self.default = func
+        with self.lock:
+            default, self.default = self.default, func
+            dispatch = self.dispatch.copy()
+            self.dispatch = dict([(cached_type, function) \
+                                  for cached_type, function in dispatch.iteritems() \
+                                  if function is not default])
+            self._changed()
         return func
 
-    def decorator(self, impl):
+    def on_register(self, listener):
+        """
+        Subscribe listener(field_type) for new registrations.
+
+        Could be used as decorator
+        """
+        with self.lock:
+            self.listeners = self.listeners + [listener]
+        return listener
+
+    def resolve(self, field_type):
+        """
+        Returns function registered for nearest field_type base class.
+
+        Result is memoized per type until related registration
+        """
+        try:
+            return self.dispatch[field_type]
+        except KeyError:
+            pass
+
+        with self.lock:
+            dispatch = self.dispatch
+            if field_type in dispatch:
+                return dispatch[field_type]
+
+            registry, function = self.registry, self.default
+            for base in getattr(field_type, '__mro__', (field_type,)):
+                if base in registry:
+                    function = registry[base]
+                    break
+
+            dispatch = dispatch.copy()
+            dispatch[field_type] = function
+            self.dispatch = dispatch
+        return function
+
+    def decorator(self, impl=None, when=None):
         """
         Decorator for register decorators
+
+        Decorator is compiled into field pipeline only if
+        when(field, kwargs) is true. Predicate result should
+        depend only on kwargs keys, not on values
         """
-        self._create_value = impl(self._create_value)
-        return impl
+        def _wrapper(impl):
+            with self.lock:
+                self.decorators = self.decorators + [(impl, when)]
+                self._changed()
+            return impl
 
-    def _create_value(self, *args, **kwargs):
+        if impl:
+            return _wrapper(impl)
+        return _wrapper
+
+    def _pipelines_cache(self, obj, names):
         """
-        Lowest value generator.
+        Returns (cache, key) pair for the obj pipeline lookup.
 
-        Separated from __call__, because it seems that python
-        cache __call__ reference on module import
+        Classes are not suitable to hold the cache, because of
+        attributes inheritance, so they are cached here
         """
-        if not len(args):
-            raise TypeError('Object instance is not provided')
+        if self.by_instance or isinstance(obj, type):
+            return self.compiled, (obj, names)
+
+        cached = obj.__dict__.get(self.cache_attr)
+        if cached is None or cached[0] != self.generation:
+            cached = (self.generation, {})
+            obj.__dict__[self.cache_attr] = cached
+        return cached[1], names
+
+    def compile(self, obj, kwargs=None):
+        """
+        Returns value generator for obj, with only applicable
+        decorators applied
+        """
+        names = frozenset(kwargs) if kwargs else None
+        cache, key = self._pipelines_cache(obj, names)
+
+        try:
+            return cache[key]
+        except KeyError:
+            pass
 
         if self.by_instance:
-            field_type = args[0]
+            field_type = obj
         else:
-            field_type = args[0].__class__
+            field_type = obj.__class__
 
-        function = self.registry.get(field_type, self.default)
+        function = self.resolve(field_type)
 
         if function is None:
             raise TypeError("no match %s" % field_type)
 
-        return function(*args, **kwargs)
+        for impl, when in self.decorators:
+            if when is None or when(obj, kwargs or {}):
+                function = impl(function)
+
+        cache[key] = function
+        return function
+
+    def _create_value(self, *args, **kwargs):
+        """
+        Lowest value generator.
+
+        Separated from __call__, because it seems that python
+        cache __call__ reference on module import
+        """
+        if not len(args):
+            raise TypeError('Object instance is not provided')
+
+        return self.compile(args[0], kwargs)(*args, **kwargs)
 
     def __call__(self, *args, **kwargs):
-        return self._create_value(*args, **kwargs)
+        """
+        Optional `rng` argument sets random stream for the
+        call, including all nested generators calls
+        """
+        rng = kwargs.pop('rng', None)
+        if rng is None:
+            return self._create_value(*args, **kwargs)
 
+        with xunit.rng_stream(rng):
+            return self._create_value(*args, **kwargs)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Pooled 'lorem ipsum' text generation
+"""
+import random
+import threading
+from django.contrib.webdesign import lorem_ipsum
+from django_any.xunit import get_rng
+
+PARAGRAPHS_POOL_SIZE = 100
+SENTENCES_POOL_SIZE = 500
+
+
+# lorem_ipsum uses the global `random` state
+_build_lock = threading.Lock()
+
+
+class LoremPool(object):
+    """
+    Precomputed paragraphs and sentences, served by random slices.
+
+    Pool is built once, on first use, from the fixed seed, and
+    without `random` module state changes
+    """
+    def __init__(self, paragraphs_count=PARAGRAPHS_POOL_SIZE,
+                 sentences_count=SENTENCES_POOL_SIZE, seed=0):
+        self.paragraphs_count = paragraphs_count
+        self.sentences_count = sentences_count
+        self.seed = seed
+        self._paragraphs = None
+        self._sentences = None
+
+    def _build(self):
+        with _build_lock:
+            if self._sentences is not None:
+                return
+
+            state = random.getstate()
+            try:
+                random.seed(self.seed)
+                self._paragraphs = [lorem_ipsum.paragraph() \
+                                    for _ in xrange(0, self.paragraphs_count)]
+                self._sentences = [lorem_ipsum.sentence() \
+                                   for _ in xrange(0, self.sentences_count)]
+            finally:
+                random.setstate(state)
+
+    def paragraphs(self, count):
+        """
+        Return `count` paragraphs, the first one is common
+        'Lorem ipsum' paragraph
+
+        >>> result = LoremPool().paragraphs(3)
+        >>> len(result), result[0] == lorem_ipsum.COMMON_P
+        (3, True)
+        """
+        if self._paragraphs is None:
+            self._build()
+
+        choice = get_rng().choice
+        return [lorem_ipsum.COMMON_P] + \
+               [choice(self._paragraphs) for _ in xrange(1, count)]
+
+    def text(self, min_length, max_length):
+        """
+        Return text from random sentences, with length
+        from [min_length, max_length] interval
+
+        >>> result = LoremPool().text(min_length=10, max_length=20)
+        >>> len(result) in range(10, 21)
+        True
+        """
+        if self._sentences is None:
+            self._build()
+
+        rng = get_rng()
+        length = rng.randint(min_length, max_length)
+        choice = rng.choice
+
+        sentences, total = [], 0
+        while total < length:
+            sentence = choice(self._sentences)
+            sentences.append(sentence)
+            total += len(sentence) + 1
+        return " ".join(sentences)[:length]
+
+
+lorem_pool = LoremPool()
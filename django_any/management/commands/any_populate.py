@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Populates database with generated data
+
+    ./manage.py any_populate shop.Customer=1000 shop.Order=100000 --batch-size=1000
+"""
+import random
+from optparse import make_option
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import get_model
+
+from django_any import xunit
+from django_any.models import batch
+from django_any.populate import populate, parallel_populate
+
+
+class Command(BaseCommand):
+    args = 'app_label.Model=count [app_label.Model=count ...]'
+    help = 'Populates models up to the given rows counts, ' \
+           'existing rows are counted, so interrupted run could be resumed'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', dest='batch_size', type='int', default=1000,
+                    help='Rows created and commited at once'),
+        make_option('--seed', dest='seed', type='int', default=None,
+                    help='Random seed for reproducible data'),
+        make_option('--workers', dest='workers', type='int', default=1,
+                    help='Number of worker processes, each with own db connection'),
+        make_option('--raw', dest='raw', action='store_true', default=False,
+                    help='Insert rows without validation, save() calls and signals'),
+    )
+
+    def parse_targets(self, args):
+        """
+        Returns {model: target rows count}
+        """
+        targets = {}
+        for arg in args:
+            label, _, count = arg.partition('=')
+            app_label, _, model_name = label.partition('.')
+            if not count.isdigit() or not model_name:
+                raise CommandError("Expected app_label.Model=count, not '%s'" % arg)
+
+            model_cls = get_model(app_label, model_name)
+            if model_cls is None:
+                raise CommandError("Unknown model '%s'" % label)
+            targets[model_cls] = int(count)
+        return targets
+
+    def handle(self, *args, **options):
+        targets = self.parse_targets(args)
+        if not targets:
+            raise CommandError('Enter at least one app_label.Model=count')
+        if options['workers'] < 1:
+            raise CommandError('--workers should be positive')
+        rng = random.Random(options['seed'])
+
+        verbosity = int(options.get('verbosity', 1))
+        counts = {}
+        for model_cls, target in targets.iteritems():
+            existing = model_cls._default_manager.count()
+            counts[model_cls] = max(target - existing, 0)
+            if verbosity:
+                self.stdout.write('%s: %d rows exists, %d to create\n' % (
+                    model_cls._meta.object_name, existing, counts[model_cls]))
+
+        started, last = {}, [timer()]
+        def progress(model_cls, created, count):
+            # model creation starts after the previous one finished
+            started.setdefault(model_cls, last[0])
+            last[0] = timer()
+            if verbosity:
+                elapsed = last[0] - started[model_cls]
+                self.stdout.write('%s: %d/%d (%d%%), %.1f rows/sec\n' % (
+                    model_cls._meta.object_name, created, count, 100 * created / count,
+                    created / elapsed if elapsed else float(created)))
+
+        if options['workers'] > 1:
+            try:
+                with xunit.rng_stream(rng):
+                    created = parallel_populate(counts, options['workers'],
+                                                options['batch_size'], options['raw'],
+                                                options['seed'], progress)
+            except TypeError, e:
+                raise CommandError(str(e))
+        else:
+            with batch(size=options['batch_size']):
+                with xunit.rng_stream(rng):
+                    created = populate(counts, options['batch_size'], options['raw'],
+                                       progress)
+
+        if verbosity:
+            self.stdout.write('Created %d rows\n' % sum(created.values()))
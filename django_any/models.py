@@ -3,27 +3,52 @@
 """
 Values generators for common Django Fields
 """
-import re, os, random
-from decimal import Decimal
+import re, os, sys, random, logging, zlib, threading
+from collections import defaultdict
+from contextlib import contextmanager
+from timeit import default_timer as timer
 from datetime import date, datetime, time
+from functools import partial
 from string import ascii_letters, digits
-from random import choice
 
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ValidationError, NON_FIELD_ERRORS
 from django.core import validators
-from django.db import models, IntegrityError
+from django.core.management.color import no_style
+from django.db import connections, models, transaction, IntegrityError, \
+    DEFAULT_DB_ALIAS
 from django.db.models import Q
 from django.db.models.fields.files import FieldFile
-from django.contrib.webdesign.lorem_ipsum import paragraphs
 
 from django_any import xunit
-from django_any.functions import valid_choices, split_model_kwargs, \
-    ExtensionMethod
+from django_any.lorem import lorem_pool
+from django_any.functions import choice_keys, choice_sampler, \
+    split_model_kwargs, field_range, validator_bounds, ExtensionMethod
+
+logger = logging.getLogger('django_any')
 
 any_field = ExtensionMethod()
 any_model = ExtensionMethod(by_instance=True)
 
-@any_field.decorator
+@any_field.decorator(when=lambda field, kwargs: 'regex' in kwargs or \
+                         xunit.regex_supported(validator_bounds(field).get('regex')))
+def any_field_regex(function):
+    """
+    Returns string matching `regex` argument or custom field RegexValidator
+
+    >>> from django.core.validators import RegexValidator
+    >>> result = any_field(models.CharField(max_length=8, validators=[RegexValidator(r'^\d{3}-\d{4}$')]))
+    >>> re.match(r'^\d{3}-\d{4}$', result) is not None
+    True
+    """
+    def wrapper(field, **kwargs):
+        regex = kwargs.get('regex') or validator_bounds(field)['regex']
+        max_length = getattr(field, 'max_length', None)
+        _, max_length = field_range(field, kwargs, 'length', 0, max_length or sys.maxint)
+        return xunit.any_regex_string(regex, max_length=max_length)
+    return wrapper
+
+
+@any_field.decorator(when=lambda field, kwargs: 'isnull' in kwargs or field.blank)
 def any_field_blank(function):
     """
     Sometimes return None if field could be blank
@@ -38,20 +63,27 @@ def any_field_blank(function):
     return wrapper
 
 
-@any_field.decorator
+@any_field.decorator(when=lambda field, kwargs: field.choices)
 def any_field_choices(function):
     """
     Selection from field.choices
 
+    `distribution` argument could be 'uniform', 'zipf', ('zipf', exponent),
+    weights list or {choice: weight} dict
+
     >>> CHOICES = [('YNG', 'Child'), ('OLD', 'Parent')]
     >>> result = any_field(models.CharField(max_length=3, choices=CHOICES))
     >>> result in ['YNG', 'OLD']
     True
+    >>> any_field(models.CharField(max_length=3, choices=CHOICES), distribution={'OLD': 1})
+    'OLD'
     """
     def wrapper(field, **kwargs):
-        if field.choices:
-            return random.choice(list(valid_choices(field.choices)))
-        return function(field, **kwargs)
+        keys = choice_keys(field, field.choices)
+        sampler = choice_sampler(field, keys, kwargs.get('distribution'))
+        if sampler is None:
+            return keys[xunit.any_index(len(keys))]
+        return keys[sampler.sample()]
 
     return wrapper
 
@@ -65,8 +97,7 @@ def any_biginteger_field(field, **kwargs):
     >>> type(result)
     <type 'long'>
     """
-    min_value = kwargs.get('min_value', 1)
-    max_value = kwargs.get('max_value', 10**10)
+    min_value, max_value = field_range(field, kwargs, 'value', 1, 10**10)
     return long(xunit.any_int(min_value=min_value, max_value=max_value))
 
 
@@ -93,8 +124,7 @@ def any_positiveinteger_field(field, **kwargs):
     >>> result > 0
     True
     """
-    min_value = kwargs.get('min_value', 1)
-    max_value = kwargs.get('max_value', 9999)
+    min_value, max_value = field_range(field, kwargs, 'value', 1, 9999)
     return xunit.any_int(min_value=min_value, max_value=max_value)
 
 
@@ -107,8 +137,7 @@ def any_char_field(field, **kwargs):
     >>> type(result)
     <type 'str'>
     """
-    min_length = kwargs.get('min_length', 1)
-    max_length = kwargs.get('max_length', field.max_length)
+    min_length, max_length = field_range(field, kwargs, 'length', 1, field.max_length)
     return xunit.any_string(min_length=min_length, max_length=max_length)
 
 
@@ -169,10 +198,9 @@ def any_decimal_field(field, **kwargs):
     >>> type(result)
     <class 'decimal.Decimal'>
     """
-    min_value = kwargs.get('min_value', 0)
-    max_value = kwargs.get('max_value',
-                           Decimal('%s.%s' % ('9'*(field.max_digits-field.decimal_places),
-                                              '9'*field.decimal_places)))
+    digits_max = xunit.max_decimal(field.max_digits, field.decimal_places)
+    min_value, max_value = field_range(field, kwargs, 'value', 0, digits_max)
+    max_value = min(max_value, digits_max)
     decimal_places = kwargs.get('decimal_places', field.decimal_places)
     return xunit.any_decimal(min_value=min_value, max_value=max_value,
                              decimal_places = decimal_places)
@@ -203,36 +231,72 @@ def any_float_field(field, **kwargs):
     >>> type(result)
     <type 'float'>
     """
-    min_value = kwargs.get('min_value', 1)
-    max_value = kwargs.get('max_value', 100)
+    min_value, max_value = field_range(field, kwargs, 'value', 1, 100)
     precision = kwargs.get('precision', 3)
     return xunit.any_float(min_value=min_value, max_value=max_value, precision=precision)
 
 
+FILE_INDEX_TTL = 60
+
+_file_indexes = {}
+
+
+def _cached_file_index(key, build, mtime):
+    """
+    Returns (directory, files) pair for the nearest directory with files.
+
+    build() result is cached by key, until directory mtime changes
+    or FILE_INDEX_TTL seconds expires
+    """
+    now = timer()
+    cached = _file_indexes.get(key)
+    if cached is not None:
+        built_at, built_mtime, directory, files = cached
+        if now - built_at < FILE_INDEX_TTL and \
+                (directory is None or mtime(directory) == built_mtime):
+            return directory, files
+
+    directory, files = build()
+    built_mtime = mtime(directory) if directory is not None else None
+    _file_indexes[key] = (now, built_mtime, directory, files)
+    return directory, files
+
+
 @any_field.register(models.FileField)
 def any_file_field(field, **kwargs):
     """
     Lookup for nearest existing file
 
+    File is opened only on content access
     """
     def get_some_file(path):
         subdirs, files = field.storage.listdir(path)
 
         if files:
-            result_file = random.choice(files)
-            instance = field.storage.open("%s/%s" % (path, result_file)).file
-            return FieldFile(instance, field, result_file)
+            return path, files
 
         for subdir in subdirs:
             result = get_some_file("%s/%s" % (path, subdir))
-            if result:
+            if result[0] is not None:
                 return result
-            
-    result = get_some_file(field.upload_to)
+        return None, []
 
-    if result is None and not field.null:
-        raise TypeError("Can't found file in %s for non nullable FileField" % field.upload_to)
-    return result
+    def mtime(path):
+        try:
+            return os.path.getmtime(field.storage.path(path))
+        except NotImplementedError:
+            return None
+
+    path, files = _cached_file_index((field.storage, field.upload_to),
+                                     lambda: get_some_file(field.upload_to),
+                                     mtime)
+
+    if not files:
+        if not field.null:
+            raise TypeError("Can't found file in %s for non nullable FileField" % field.upload_to)
+        return None
+
+    return FieldFile(None, field, "%s/%s" % (path, xunit.get_rng().choice(files)))
 
 
 @any_field.register(models.FilePathField)
@@ -252,18 +316,24 @@ def any_filepath_field(field, **kwargs):
                     files.append(entry_path)
 
         if files:
-            return random.choice(files)
-        
+            return path, files
+
         if field.recursive:
             for subdir in subdirs:
                 result = get_some_file(subdir)
-                if result:
+                if result[0] is not None:
                     return result
+        return None, []
 
-    result = get_some_file(field.path)
-    if result is None and not field.null:
-        raise TypeError("Can't found file in %s for non nullable FilePathField" % field.path)
-    return result
+    path, files = _cached_file_index((field.path, field.match, field.recursive),
+                                     lambda: get_some_file(field.path),
+                                     os.path.getmtime)
+
+    if not files:
+        if not field.null:
+            raise TypeError("Can't found file in %s for non nullable FilePathField" % field.path)
+        return None
+    return xunit.get_rng().choice(files)
 
 
 @any_field.register(models.IPAddressField)
@@ -289,7 +359,7 @@ def any_nullboolean_field(field, **kwargs):
     >>> result in [None, True, False]
     True
     """
-    return random.choice([None, True, False])
+    return xunit.get_rng().choice([None, True, False])
 
 
 @any_field.register(models.PositiveSmallIntegerField)
@@ -302,8 +372,7 @@ def any_positivesmallinteger_field(field, **kwargs):
     >>> result < 256, result > 0
     (True, True)
     """
-    min_value = kwargs.get('min_value', 1)
-    max_value = kwargs.get('max_value', 255)
+    min_value, max_value = field_range(field, kwargs, 'value', 1, 255)
     return xunit.any_int(min_value=min_value, max_value=max_value)
 
 
@@ -319,7 +388,8 @@ def any_slug_field(field, **kwargs):
     True
     """
     letters = ascii_letters + digits + '_-'
-    return xunit.any_string(letters = letters, max_length = field.max_length)
+    min_length, max_length = field_range(field, kwargs, 'length', 3, field.max_length)
+    return xunit.any_string(letters = letters, min_length = min_length, max_length = max_length)
 
 
 @any_field.register(models.SmallIntegerField)
@@ -332,8 +402,7 @@ def any_smallinteger_field(field, **kwargs):
     >>> result > -256, result < 256
     (True, True)
     """
-    min_value = kwargs.get('min_value', -255)
-    max_value = kwargs.get('max_value', 255)
+    min_value, max_value = field_range(field, kwargs, 'value', -255, 255)
     return xunit.any_int(min_value=min_value, max_value=max_value)
 
 
@@ -345,8 +414,7 @@ def any_integer_field(field, **kwargs):
     >>> type(result)
     <type 'int'>
     """
-    min_value = kwargs.get('min_value', -10000)
-    max_value = kwargs.get('max_value', 10000)
+    min_value, max_value = field_range(field, kwargs, 'value', -10000, 10000)
     return xunit.any_int(min_value=min_value, max_value=max_value)
 
 
@@ -354,12 +422,27 @@ def any_integer_field(field, **kwargs):
 def any_text_field(field, **kwargs):
     """
     Return random 'lorem ipsum' Latin text
+
+    Text length could be limited by min_length and max_length,
+    otherwise `paragraphs` count (default 10) is returned
+
     >>> result = any_field(models.TextField())
     >>> from django.contrib.webdesign.lorem_ipsum import COMMON_P
-    >>> result[0] == COMMON_P
+    >>> result.startswith(COMMON_P)
+    True
+    >>> result = any_field(models.TextField(), max_length=100)
+    >>> len(result) <= 100
     True
     """
-    return paragraphs(10)
+    min_length = kwargs.get('min_length')
+    max_length = kwargs.get('max_length', field.max_length)
+
+    if min_length is None and max_length is None:
+        return "\n\n".join(lorem_pool.paragraphs(kwargs.get('paragraphs', 10)))
+
+    min_length = min_length or 1
+    max_length = max_length or max(min_length, 1000)
+    return lorem_pool.text(min_length=min_length, max_length=max_length)
 
 
 @any_field.register(models.URLField)
@@ -378,7 +461,7 @@ def any_url_field(field, **kwargs):
                     if isinstance(validator, validators.URLValidator) and \
                     validator.verify_exists == True]
         if verified:
-            url = choice(['http://news.yandex.ru/society.html',
+            url = xunit.get_rng().choice(['http://news.yandex.ru/society.html',
                           'http://video.google.com/?hl=en&tab=wv',
                           'http://www.microsoft.com/en/us/default.aspx',
                           'http://habrahabr.ru/company/opera/',
@@ -409,66 +492,993 @@ def any_time_field(field, **kwargs):
         xunit.any_int(min_value=0, max_value=59))
 
 
+RELATED_CREATE, RELATED_REUSE, RELATED_EXISTING = 'create', 'reuse', 'existing'
+
+
+class RelatedObjects(object):
+    """
+    ForeignKey values selection policies:
+
+     * create - new related object for each row
+     * reuse - select from bounded pool of previously created objects
+     * existing - select from rows already existing in db
+
+    Pools are kept between calls, and dropped once referenced rows
+    turn out to be missing, ex: after db rollback
+    """
+    def __init__(self, policy=RELATED_CREATE, pool_size=100):
+        self.policy = policy
+        self.pool_size = pool_size
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.pools = {}
+        self.pks = {}
+
+    def reuse(self, model_cls, count, create, distribution=None, unsaved=False):
+        """
+        Returns `count` objects from the pool, create(n) is
+        called to fill the pool up. Unsaved objects are pooled apart.
+
+        Weights list distribution selects all objects from the first
+        len(weights) pooled ones, the pool is filled up to them first
+        """
+        weights = isinstance(distribution, (list, tuple)) and distribution and \
+            not isinstance(distribution[0], basestring)
+        if weights and len(distribution) > self.pool_size:
+            raise TypeError("%d weights exceed %s reuse pool size %d" % (
+                len(distribution), model_cls.__name__, self.pool_size))
+
+        with self.lock:
+            pool = self.pools.setdefault((model_cls, unsaved), [])
+            if weights:
+                missing = len(distribution) - len(pool)
+            else:
+                missing = min(count, self.pool_size - len(pool))
+
+        # objects are created without the lock, and pooled
+        # while the pool is not filled up by other threads
+        created = []
+        if missing > 0:
+            created = create(missing)
+        with self.lock:
+            pool.extend(created[:self.pool_size - len(pool)])
+            size = len(pool)
+
+        # pools only grow, so the first `size` items are stable
+        if weights:
+            indexes = xunit.any_index_batch(count, len(distribution), distribution)
+            return [pool[index] for index in indexes]
+        indexes = xunit.any_index_batch(count - len(created), size, distribution)
+        return created + [pool[index] for index in indexes]
+
+    def existing(self, model_cls, count, distribution=None, fetch=True):
+        """
+        Returns `count` objects, selected from the cached db primary
+        keys list. Without `fetch` objects are not loaded, and only
+        primary keys are set
+
+        Outdated keys list, ex: after db rollback, is reloaded
+        """
+        pks = self.pks.get(model_cls)
+        if pks is None:
+            pks = list(model_cls._default_manager.order_by('pk') \
+                           .values_list('pk', flat=True))
+            with self.lock:
+                pks = self.pks.setdefault(model_cls, pks)
+
+        if not pks:
+            raise TypeError("No %s objects exists in db" % model_cls.__name__)
+
+        selected = [pks[index] for index in xunit.any_index_batch(count, len(pks), distribution)]
+        if not fetch:
+            return [model_cls(pk=pk) for pk in selected]
+
+        rows = model_cls._default_manager.in_bulk(list(set(selected)))
+        if len(rows) < len(set(selected)):
+            self.forget(model_cls)
+            return self.existing(model_cls, count, distribution, fetch)
+        return [rows[pk] for pk in selected]
+
+    def forget(self, model_cls):
+        """
+        Drops pooled objects and cached primary keys of the model,
+        when referenced rows turned out to be missing
+        """
+        with self.lock:
+            self.pks.pop(model_cls, None)
+            self.pools.pop((model_cls, False), None)
+
+    def policy_for(self, kwargs):
+        """
+        Returns policy applied for the ForeignKey field arguments. Field
+        subarguments always require new objects creation, and unsaved
+        objects are never selected from db
+        """
+        kwargs = dict(kwargs)
+        policy = kwargs.pop('policy', self.policy)
+        kwargs.pop('distribution', None)
+        kwargs.pop('validate', None)
+        unsaved = kwargs.pop('unsaved', False)
+        if kwargs or (policy == RELATED_EXISTING and unsaved):
+            return RELATED_CREATE
+        return policy
+
+    def select(self, field, count, kwargs, create, fetch=True):
+        """
+        Returns `count` related objects for the ForeignKey field, with
+        respect of `policy` and `distribution` field arguments. Existing
+        objects are loaded only with `fetch`
+        """
+        policy = self.policy_for(kwargs)
+        kwargs = dict(kwargs)
+        kwargs.pop('policy', None)
+        distribution = kwargs.pop('distribution', None)
+        build = dict([(name, kwargs.pop(name)) for name in ('unsaved', 'validate') \
+                      if name in kwargs])
+
+        if policy == RELATED_REUSE:
+            return self.reuse(field.rel.to, count, lambda n: create(n, build),
+                              distribution, build.get('unsaved', False))
+        elif policy == RELATED_EXISTING:
+            return self.existing(field.rel.to, count, distribution, fetch)
+        kwargs.update(build)
+        return create(count, kwargs)
+
+
+related_objects = RelatedObjects()
+
+
 @any_field.register(models.ForeignKey)
 def any_foreignkey_field(field, **kwargs):
-    return any_model(field.rel.to, **kwargs)
+    """
+    Creates related object, or selects one accordingly
+    `policy` argument, see RelatedObjects
+    """
+    create = lambda count, kwargs: [any_model(field.rel.to, **kwargs) \
+                                     for _ in xrange(0, count)]
+    return related_objects.select(field, 1, kwargs, create)[0]
 
 
 @any_field.register(models.OneToOneField)
 def any_onetoone_field(field, **kwargs):
+    kwargs.pop('policy', None)
+    kwargs.pop('distribution', None)
     return any_model(field.rel.to, **kwargs)
 
 
-def _fill_model_fields(model, **kwargs):
+SKIP_PARENT_LINK, SKIP_AUTO = 'parent_link', 'auto'
+
+_fill_plans = {}
+
+
+class FillPlan(object):
+    """
+    Model fields traversal, compiled once per model class
+    """
+    def __init__(self, model_cls):
+        self.model_cls = model_cls
+        self.inserts = {}
+        self.fields = []
+        for field in model_cls._meta.fields:
+            if isinstance(field, models.OneToOneField) and field.rel.parent_link:
+                skip = SKIP_PARENT_LINK
+            elif isinstance(field, models.fields.AutoField):
+                skip = SKIP_AUTO
+            else:
+                skip = None
+            self.fields.append((field.name, field, partial(any_field, field), skip))
+
+        self.generators = dict([(name, generator) \
+                                for name, _, generator, _ in self.fields])
+        self.attnames = dict([(name, field.attname) \
+                              for name, field, _, _ in self.fields])
+
+        self.unique = [(name,) for name, field, _, skip in self.fields \
+                       if field.unique and not skip] + \
+                      [tuple(check) for check in model_cls._meta.unique_together]
+
+        self.onetoone = [(relation.var_name, relation.field) \
+                         for relation in model_cls._meta.get_all_related_objects() \
+                         if relation.field.unique] # TODO and not relation.field.rel.parent_link ??
+
+    def uses(self, field_type):
+        for _, field, _, _ in self.fields:
+            if isinstance(field, field_type):
+                return True
+        return False
+
+    def insert(self, connection, with_pk):
+        """
+        Returns parameterized INSERT statement and its fields, auto
+        primary key column is included only `with_pk`
+        """
+        key = (connection.alias, with_pk)
+        try:
+            return self.inserts[key]
+        except KeyError:
+            opts = self.model_cls._meta
+            fields = [field for field in opts.local_fields \
+                      if with_pk or not isinstance(field, models.fields.AutoField)]
+            qn = connection.ops.quote_name
+            sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+                qn(opts.db_table),
+                ', '.join([qn(field.column) for field in fields]),
+                ', '.join(['%s'] * len(fields)))
+            return self.inserts.setdefault(key, (sql, fields))
+
+
+def get_fill_plan(model_cls):
+    try:
+        return _fill_plans[model_cls]
+    except KeyError:
+        return _fill_plans.setdefault(model_cls, FillPlan(model_cls))
+
+
+@any_field.on_register
+def _invalidate_field_plans(field_type):
+    for model_cls, plan in _fill_plans.items():
+        if plan.uses(field_type):
+            _fill_plans.pop(model_cls, None)
+
+
+@any_model.on_register
+def _invalidate_model_plan(model_cls):
+    _fill_plans.pop(model_cls, None)
+
+
+any_unique_sequence = ExtensionMethod()
+
+
+@any_unique_sequence.register_default
+def any_unique_sequence_default(field, value, number):
+    """
+    Field values couldn't be made unique by sequence
+    """
+    return None
+
+
+@any_unique_sequence.register(models.IntegerField)
+def any_unique_sequence_integer(field, value, number):
+    return number
+
+
+@any_unique_sequence.register(models.CharField)
+def any_unique_sequence_char(field, value, number):
+    suffix = str(number)
+    if field.max_length and len(suffix) > field.max_length:
+        return None
+    return value[:field.max_length - len(suffix)] + suffix
+
+
+@any_unique_sequence.register(models.EmailField)
+def any_unique_sequence_email(field, value, number):
+    local, _, domain = value.partition('@')
+    result = '%s%d@%s' % (local, number, domain)
+    if field.max_length and len(result) > field.max_length:
+        return None
+    return result
+
+
+class UniqueValues(object):
+    """
+    Tracks issued values of unique fields and unique_together groups.
+
+    Already existing in db values are loaded once, on first use
+    with db access allowed
+
+    With `partition` set to (index, count), only values with
+    crc32(repr(values)) % count == index are issued, so parallel
+    workers never collide
+    """
+    attempts = 10
+    partition = None
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def owns(self, values):
+        if self.partition is None:
+            return True
+        index, count = self.partition
+        return (zlib.crc32(repr(values)) & 0xffffffff) % count == index
+
+    def reset(self):
+        """
+        Forget issued values, ex: after test transaction rollback
+        """
+        self.issued = {}
+        self.loaded = set()
+        self.sequences = {}
+
+    def _issued(self, model_cls, names, load=True):
+        key = (model_cls, names)
+        with self.lock:
+            issued = self.issued.setdefault(key, set())
+            if not load or key in self.loaded:
+                return issued
+
+        existing = [values for values in model_cls._default_manager.values_list(*names) \
+                    if None not in values]
+        with self.lock:
+            if key not in self.loaded:
+                issued.update(existing)
+                self.loaded.add(key)
+        return issued
+
+    def _sequence(self, model, name, issued):
+        field = model._meta.get_field(name)
+        value = getattr(model, field.attname)
+        if value is None:
+            return None
+        number = self.sequences.get((model.__class__, name), 0)
+
+        while True:
+            number += 1
+            result = any_unique_sequence(field, value, number)
+            if result is None:
+                return None
+            if (result,) not in issued and self.owns((result,)):
+                self.sequences[(model.__class__, name)] = number
+                return result
+
+    def issue(self, model, names, free, fields_args, load=True):
+        """
+        Regenerates `free` fields until names values are not issued yet.
+
+        Returns False if uniqueness is not ensured. The lock is held
+        only to check and add values, candidates are generated
+        without it, as they could create related objects
+        """
+        plan = get_fill_plan(model.__class__)
+        issued = self._issued(model.__class__, names, load)
+
+        values = tuple([getattr(model, plan.attnames[name]) for name in names])
+        if None in values:
+            # NULLs never collide, and are skipped by validate_unique
+            return bool(free)
+        if not free:
+            with self.lock:
+                issued.add(values)
+            return False
+
+        attempts = self.attempts
+        if self.partition is not None:
+            attempts *= self.partition[1]
+        while True:
+            with self.lock:
+                if None in values:
+                    return True
+                if values not in issued and self.owns(values):
+                    issued.add(values)
+                    return True
+
+                attempts -= 1
+                if not attempts:
+                    if len(names) > 1:
+                        return False
+                    value = self._sequence(model, names[0], issued)
+                    if value is None:
+                        return False
+                    setattr(model, names[0], value)
+                    issued.add((value,))
+                    return True
+
+            for name in free:
+                setattr(model, name, plan.generators[name](**fields_args[name]))
+            values = tuple([getattr(model, plan.attnames[name]) for name in names])
+
+
+unique_values = UniqueValues()
+_trackers = threading.local()
+
+
+def _unique_values():
+    """
+    Tracker of the current thread, shared `unique_values` by default
+    """
+    return getattr(_trackers, 'current', unique_values)
+
+
+def _fill_fields(model, kwargs, only=None, ensured=(), unsaved=False, validate=True):
+    """
+    Fills model fields, or only selected ones, returns names
+    of fields with ensured uniqueness
+
+    In unsaved mode related objects are built without saving too
+    """
     model_fields, fields_args = split_model_kwargs(kwargs)
+    plan = get_fill_plan(model.__class__)
+    generated = set()
+
+    if unsaved:
+        for name, field, _, _ in plan.fields:
+            if isinstance(field, models.ForeignKey):
+                fields_args[name] = dict(fields_args[name], unsaved=True,
+                                         validate=validate)
 
     # fill local fields
-    for field in model._meta.fields:
-        if field.name in model_fields:
-            if isinstance(kwargs[field.name], Q):
+    for name, field, generator, skip in plan.fields:
+        if only is not None and name not in only:
+            continue
+        if name in model_fields:
+            if only is not None:
+                """
+                explicit value is already set
+                """
+            elif isinstance(kwargs[name], Q):
                 """
                 Lookup ForeingKey field in db
                 """
-                key_field = model._meta.get_field(field.name)
-                value = key_field.rel.to.objects.get(kwargs[field.name])
-                setattr(model, field.name, value)
+                value = field.rel.to.objects.get(kwargs[name])
+                setattr(model, name, value)
             else:
                 # TODO support any_model call
-                setattr(model, field.name, kwargs[field.name])
-        elif isinstance(field, models.OneToOneField) and field.rel.parent_link:
+                setattr(model, name, kwargs[name])
+        elif skip:
             """
-            skip link to parent instance
-            """
-        elif isinstance(field, models.fields.AutoField):
-            """
-            skip primary key field
+            skip link to parent instance and primary key field
             """
         else:
-            setattr(model, field.name, any_field(field, **fields_args[field.name]))
+            setattr(model, name, generator(**fields_args[name]))
+            generated.add(name)
 
     # procceed reversed relations
-    onetoone = [(relation.var_name, relation.field) \
-                for relation in model._meta.get_all_related_objects() \
-                if relation.field.unique] # TODO and not relation.field.rel.parent_link ??
-    for field_name, field in onetoone:
-        if field_name in model_fields:
-            # TODO support any_model call
-            setattr(model, field_name, kwargs[field_name])
+    if only is None:
+        for field_name, field in plan.onetoone:
+            if field_name in model_fields:
+                # TODO support any_model call
+                setattr(model, field_name, kwargs[field_name])
+
+    # issue not colliding values for unique fields
+    ensured, unsure = set(ensured), set()
+    for names in plan.unique:
+        if only is not None and not only.intersection(names):
+            continue
+        free = [name for name in names if name in generated]
+        if _unique_values().issue(model, names, free, fields_args, load=not unsaved):
+            ensured.update(names)
+        else:
+            unsure.update(names)
+    return ensured - unsure
+
+
+def _fill_model_fields(model, **kwargs):
+    return _fill_fields(model, kwargs)
+
+
+def _failed_fields(model, error):
+    """
+    Returns names of the fields need to be regenerated after error.
+
+    Without exact fields known, all not related fields are selected
+    """
+    failed = set()
+    if isinstance(error, ValidationError) and hasattr(error, 'message_dict'):
+        failed = set(error.message_dict.keys())
+
+    if not failed or NON_FIELD_ERRORS in failed:
+        failed.discard(NON_FIELD_ERRORS)
+        failed.update([name for name, field, _, _ in get_fill_plan(model.__class__).fields \
+                       if not isinstance(field, models.ForeignKey)])
+    return failed
+
+
+def _refill_model_fields(model, error, retries, ensured, kwargs, unsaved=False):
+    """
+    Regenerates only fields failed with error, already created
+    related objects are kept
+    """
+    failed = _failed_fields(model, error)
+    for name in failed:
+        retries[name] += 1
+    for name, field, _, _ in get_fill_plan(model.__class__).fields:
+        if name in failed and isinstance(field, models.ForeignKey):
+            # pooled parent could be missing after db rollback
+            related_objects.forget(field.rel.to)
+    logger.debug('%s: regenerate %s after %s', model.__class__.__name__,
+                 ', '.join(sorted(failed)), error.__class__.__name__)
+    return _fill_fields(model, kwargs, only=failed, ensured=ensured, unsaved=unsaved)
+
+
+def _full_clean(model, unique_ensured=()):
+    """
+    Same as Model.full_clean, but skips db uniqueness checks
+    for the fields with ensured uniqueness
+    """
+    errors = {}
+    try:
+        model.clean_fields()
+    except ValidationError, e:
+        errors = e.update_error_dict(errors)
+
+    try:
+        model.clean()
+    except ValidationError, e:
+        errors = e.update_error_dict(errors)
+
+    exclude = list(unique_ensured) + \
+              [name for name in errors.keys() if name != NON_FIELD_ERRORS]
+    try:
+        model.validate_unique(exclude=exclude)
+    except ValidationError, e:
+        errors = e.update_error_dict(errors)
+
+    if errors:
+        raise ValidationError(errors)
+
+
+class Batch(object):
+    """
+    Context manager, commits created objects once per `size`
+    creations, instead of commit per each object
+
+        with batch(size=500):
+            for _ in xrange(0, 10000):
+                any_model(Order)
+
+    Everything is commited on exit, or rolled back on error
+    """
+    def __init__(self, size=100, using=None):
+        self.size = size
+        self.using = using or DEFAULT_DB_ALIAS
+        self.pending = 0
+
+    def __enter__(self):
+        transaction.enter_transaction_management(using=self.using)
+        transaction.managed(True, using=self.using)
+        _active_batches().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active_batches().remove(self)
+        try:
+            if exc_type is None:
+                self.flush()
+            else:
+                transaction.rollback(using=self.using)
+        finally:
+            transaction.leave_transaction_management(using=self.using)
+
+    def created(self, count=1):
+        self.pending += count
+        if self.pending >= self.size:
+            self.flush()
+
+    def flush(self):
+        if transaction.is_dirty(using=self.using):
+            transaction.commit(using=self.using)
+        self.pending = 0
+
+
+_batches = threading.local()
+
+
+def _active_batches():
+    """
+    Batches are per thread, as well as db connections
+    """
+    try:
+        return _batches.stack
+    except AttributeError:
+        _batches.stack = []
+        return _batches.stack
+
+
+def batch(size=100, using=None):
+    return Batch(size, using)
+
+
+def _batch_created(using, count=1):
+    for active in reversed(_active_batches()):
+        if active.using == using:
+            active.created(count)
+            return
+
+
+def _save_model(model):
+    """
+    Saves model, within the managed transaction failed save is
+    rolled back to the savepoint, keeping the transaction usable
+    """
+    using = model._state.db or model.__class__._default_manager.db
+    if not transaction.is_managed(using=using):
+        model.save()
+        return
+
+    sid = transaction.savepoint(using=using)
+    try:
+        model.save()
+    except IntegrityError:
+        transaction.savepoint_rollback(sid, using=using)
+        raise
+    transaction.savepoint_commit(sid, using=using)
+    _batch_created(using)
 
 
 @any_model.register_default
 def any_model_default(model_cls, **kwargs):
+    """
+    Creates and saves model instance.
+
+    With `unsaved=True` the instance is only built, see any_model_build
+    """
+    unsaved = kwargs.pop('unsaved', False)
+    validate = kwargs.pop('validate', True)
+    if unsaved:
+        return _build_model(model_cls, kwargs, unsaved=True, validate=validate)
+
     result = model_cls()
+    unique_ensured = _fill_model_fields(result, **kwargs)
+    retries = defaultdict(int)
 
     attempts = 10
     while True:
         try:
-            _fill_model_fields(result, **kwargs)
-            result.full_clean()
-            result.save()
+            _full_clean(result, unique_ensured)
+            _save_model(result)
+            if retries:
+                logger.debug('%s: created with retries %s', model_cls.__name__, dict(retries))
             return result
-        except (IntegrityError, ValidationError):
+        except (IntegrityError, ValidationError), e:
             attempts -= 1
             if not attempts:
                 raise
+            unique_ensured = _refill_model_fields(result, e, retries,
+                                                  unique_ensured, kwargs)
+
+
+def _build_model(model_cls, kwargs, unsaved=False, validate=True, exclude=None):
+    """
+    Returns filled and validated, but not saved model instance.
+
+    Uniqueness is ensured by issued values tracking only, without
+    db lookups. In unsaved mode related objects are not saved
+    either, and not checked for existence in db. `exclude` fields
+    are not validated
+    """
+    result = model_cls()
+    unique_ensured = _fill_fields(result, kwargs, unsaved=unsaved, validate=validate)
+    if not validate:
+        return result
 
+    exclude = list(exclude or [])
+    if unsaved:
+        exclude.extend([name for name, field, _, _ in get_fill_plan(model_cls).fields \
+                        if isinstance(field, models.ForeignKey)])
+    retries = defaultdict(int)
+
+    attempts = 10
+    while True:
+        try:
+            result.clean_fields(exclude=exclude)
+            result.clean()
+            return result
+        except ValidationError, e:
+            attempts -= 1
+            if not attempts:
+                raise
+            unique_ensured = _refill_model_fields(result, e, retries,
+                                                  unique_ensured, kwargs, unsaved)
+
+
+def any_model_build(model_cls, **kwargs):
+    """
+    Returns filled, but not saved model instance, ForeignKey
+    values are unsaved instances too. Database is never touched.
+
+    Pass validate=False to skip fields validation
+    """
+    kwargs['unsaved'] = True
+    return any_model(model_cls, **kwargs)
+
+any_model.build = any_model_build
+
+
+def _assign_pks(model_cls, connection, instances):
+    """
+    Fills missing auto primary keys with values taken from the
+    sequence, so rows could be inserted with explicit primary keys.
+    Returns False if the backend has no sequence to take values from
+    """
+    opts = model_cls._meta
+    missing = [instance for instance in instances if instance.pk is None]
+    if not missing or not isinstance(opts.pk, models.fields.AutoField):
+        return True
+    if connection.vendor != 'postgresql':
+        return False
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+                   "FROM generate_series(1, %s)",
+                   [connection.ops.quote_name(opts.db_table), opts.pk.column, len(missing)])
+    for instance, (pk,) in zip(missing, cursor.fetchall()):
+        instance.pk = pk
+    return True
+
+
+def _insert_rows(model_cls, connection, instances, keys=True):
+    """
+    Inserts instances by executemany calls, bypassing save()
+    overrides and signals. Missing auto primary keys are filled,
+    unless `keys` are not needed:
+
+     * PostgreSQL - reserved from the sequence before the insert
+     * SQLite - counted from the table maximum after the first row
+       insert, which locks the database for other writers till commit
+     * MySQL - counted from the first value of multi-row insert, InnoDB
+       takes consecutive values unless innodb_autoinc_lock_mode = 2
+     * others - inserted row by row, reading the last inserted key
+    """
+    opts = model_cls._meta
+    plan = get_fill_plan(model_cls)
+    cursor = connection.cursor()
+    qn = connection.ops.quote_name
+
+    def insert(rows, with_pk):
+        sql, fields = plan.insert(connection, with_pk)
+        if rows:
+            cursor.executemany(sql, [[field.get_db_prep_save(field.pre_save(instance, True),
+                                                             connection=connection) \
+                                      for field in fields] for instance in rows])
+        return sql, fields
+
+    auto_pk = isinstance(opts.pk, models.fields.AutoField)
+    explicit = auto_pk and any([instance.pk is not None for instance in instances])
+    missing = [instance for instance in instances if auto_pk and instance.pk is None]
+    if keys and missing and _assign_pks(model_cls, connection, missing):
+        missing = []
+    pending = set([id(instance) for instance in missing])
+    insert([instance for instance in instances if id(instance) not in pending], True)
+
+    if not missing or not keys:
+        insert(missing, False)
+    elif connection.vendor == 'sqlite':
+        insert(missing[:1], False)
+        cursor.execute('SELECT MAX(%s) FROM %s' % (qn(opts.pk.column), qn(opts.db_table)))
+        last = cursor.fetchone()[0]
+        missing[0].pk = last
+        for number, instance in enumerate(missing[1:]):
+            instance.pk = last + number + 1
+        insert(missing[1:], True)
+    elif connection.vendor == 'mysql':
+        insert(missing, False)
+        first = connection.ops.last_insert_id(cursor, opts.db_table, opts.pk.column)
+        for number, instance in enumerate(missing):
+            instance.pk = first + number
+    else:
+        for instance in missing:
+            insert([instance], False)
+            instance.pk = connection.ops.last_insert_id(cursor, opts.db_table,
+                                                        opts.pk.column)
+
+    if explicit:
+        # explicit values don't advance sequences on some backends
+        for statement in connection.ops.sequence_reset_sql(no_style(), [model_cls]):
+            cursor.execute(statement)
+
+
+@contextmanager
+def _writes(using):
+    """
+    Commits the block writes, or rolls them back on error. Within
+    managed transaction, ex: batch(), the block is rolled back to the
+    savepoint only, and commits are left to the transaction owner
+    """
+    if not transaction.is_managed(using=using):
+        with transaction.commit_on_success(using=using):
+            yield
+        return
+
+    sid = transaction.savepoint(using=using)
+    try:
+        yield
+    except:
+        transaction.savepoint_rollback(sid, using=using)
+        raise
+    transaction.savepoint_commit(sid, using=using)
+
+
+def _check_related(instances, fields):
+    """
+    Checks that ForeignKey values of the instances exist in db,
+    with single query per field and chunk of values
+    """
+    chunk = 500
+    for field in fields:
+        related = field.rel.get_related_field()
+        values = list(set([getattr(instance, field.attname) for instance in instances]) \
+                      - set([None]))
+        found = set()
+        for start in xrange(0, len(values), chunk):
+            lookup = {'%s__in' % related.name: values[start:start + chunk]}
+            found.update(field.rel.to._default_manager.filter(**lookup) \
+                             .values_list(related.attname, flat=True))
+
+        missing = [value for value in values if value not in found]
+        if missing:
+            related_objects.forget(field.rel.to)
+            raise ValidationError({field.name: [field.error_messages['invalid'] % {
+                'model': field.rel.to._meta.verbose_name, 'pk': missing[0]}]})
+
+
+def _bulk_save(model_cls, instances, keys=True):
+    """
+    Inserts instances at once, like bulk_create, without save() calls
+    and signals. Primary keys are filled if `keys` are needed, see
+    _insert_rows. Multi-table inherited instances are saved one by one
+    """
+    manager = model_cls._default_manager
+
+    with _writes(manager.db):
+        if model_cls._meta.parents:
+            for instance in instances:
+                instance.save()
+        elif hasattr(manager, 'bulk_create') and not keys:
+            manager.bulk_create(instances)
+        else:
+            _insert_rows(model_cls, connections[manager.db], instances, keys)
+            transaction.set_dirty(using=manager.db)
+
+
+def _raw_save(model_cls, instances, keys=True):
+    """
+    Insert instances by executemany call, bypassing save()
+    overrides and signals, see _insert_rows
+    """
+    if model_cls._meta.parents:
+        raise TypeError("Raw insert of inherited model %s is not supported" \
+                        % model_cls.__name__)
+    if not instances:
+        return
+
+    manager = model_cls._default_manager
+    with _writes(manager.db):
+        _insert_rows(model_cls, connections[manager.db], instances, keys)
+        transaction.set_dirty(using=manager.db)
+
+
+def any_models(model_cls, count, batch_size=100, raw=False, **kwargs):
+    """
+    Creates `count` model instances, batch by batch
+
+    ForeignKey parents are created by the same batches, values
+    specification is the same as for any_model
+
+    Rows are inserted by batches, like bulk_create, without save()
+    calls and signals. With `raw` rows are not validated either.
+    Values are generated from the `rng` random stream, if given
+    """
+    rng = kwargs.pop('rng', None)
+    if rng is None:
+        return _any_models(model_cls, count, batch_size, raw, kwargs)
+
+    with xunit.rng_stream(rng):
+        return _any_models(model_cls, count, batch_size, raw, kwargs)
+
+
+def _any_models(model_cls, count, batch_size, raw, kwargs, columns=None,
+                collect=True, exclude=None, progress=None):
+    """
+    any_models implementation, `columns` are {name: select(count)}
+    functions, returning field values for the batch rows. Without
+    `collect` created instances are not kept, and only theirs count
+    is returned. `exclude` fields are not validated, `progress(created)`
+    is called after each batch
+    """
+    model_fields, fields_args = split_model_kwargs(kwargs)
+    columns = columns or {}
+
+    foreign_keys = [field for field in model_cls._meta.fields \
+                    if isinstance(field, models.ForeignKey) and \
+                    not field.rel.parent_link]
+    related = [field for field in foreign_keys \
+               if field.name not in model_fields and \
+               field.name not in columns]
+    existing = [field for field in related \
+                if not isinstance(field, models.OneToOneField) and \
+                related_objects.policy_for(fields_args[field.name]) == RELATED_EXISTING]
+    # ForeignKeys are validated by batches, instead of query per row
+    exclude = list(exclude or []) + [field.name for field in foreign_keys]
+
+    started = timer()
+    result = []
+    for offset in xrange(0, count, batch_size):
+        size = min(batch_size, count - offset)
+
+        parents = {}
+        for field in related:
+            if isinstance(field, models.OneToOneField):
+                fields_args[field.name].pop('policy', None)
+                fields_args[field.name].pop('distribution', None)
+                parents[field.name] = any_models(field.rel.to, size, batch_size, raw,
+                                                 **fields_args[field.name])
+            else:
+                create = lambda count, kwargs, model_cls=field.rel.to: \
+                    any_models(model_cls, count, batch_size, raw, **kwargs)
+                parents[field.name] = related_objects.select(field, size,
+                                                             fields_args[field.name],
+                                                             create, fetch=False)
+        for name, select in columns.iteritems():
+            parents[name] = select(size)
+
+        rows = []
+        for index in xrange(0, size):
+            row_kwargs = dict(kwargs)
+            for name, values in parents.iteritems():
+                row_kwargs[name] = values[index]
+            rows.append(_build_model(model_cls, row_kwargs, validate=not raw,
+                                     exclude=exclude))
+        for row in rows:
+            for field in existing:
+                # only the key of not fetched row is kept
+                row.__dict__.pop(field.get_cache_name(), None)
+
+        if not raw:
+            _check_related(rows, foreign_keys)
+        if raw:
+            _raw_save(model_cls, rows, keys=collect)
+        else:
+            _bulk_save(model_cls, rows, keys=collect)
+        _batch_created(model_cls._default_manager.db, len(rows))
+        if collect:
+            result.extend(rows)
+        if progress:
+            progress(offset + size)
+
+    elapsed = timer() - started
+    logger.info('%s: %d rows created in %.2fs (%.1f rows/sec)',
+                model_cls.__name__, count, elapsed,
+                count / elapsed if elapsed else float(count))
+    return result if collect else count
+
+
+def _values_dict(instance, prefix=''):
+    """
+    Returns {attname: value} of the instance fields. Fields of
+    ForeignKey parents without primary key are added too, with
+    `name__` prefix, like in related lookups
+    """
+    values = {}
+    for field in instance._meta.fields:
+        value = values[prefix + field.attname] = getattr(instance, field.attname)
+        if isinstance(field, models.ForeignKey) and value is None:
+            parent = getattr(instance, field.get_cache_name(), None)
+            if parent is not None:
+                values.update(_values_dict(parent, '%s%s__' % (prefix, field.name)))
+    return values
+
+
+def iter_any_model(model_cls, count=None, chunk_size=100, as_dict=False, **kwargs):
+    """
+    Lazily yields lists of `chunk_size` unsaved model instances,
+    or field values dicts with `as_dict`, see _values_dict. Without
+    `count` the stream is unbounded.
+
+    ForeignKey parents are built unsaved too, unless selected from
+    the pool by the `reuse` policy. Only issued unique values are
+    kept between chunks, by the stream own tracker, dropped with
+    the stream. The whole stream is generated from the `rng` random
+    stream, current one by default
+    """
+    validate = kwargs.pop('validate', True)
+    rng = kwargs.pop('rng', None) or xunit.get_rng()
+    tracker = UniqueValues()
+
+    produced = 0
+    while count is None or produced < count:
+        size = chunk_size if count is None else min(chunk_size, count - produced)
+        previous = _unique_values()
+        _trackers.current = tracker
+        try:
+            with xunit.rng_stream(rng):
+                chunk = [_build_model(model_cls, kwargs, unsaved=True, validate=validate) \
+                         for _ in xrange(0, size)]
+        finally:
+            _trackers.current = previous
+        if as_dict:
+            chunk = [_values_dict(instance) for instance in chunk]
+        produced += size
+        yield chunk
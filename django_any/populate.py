@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk population of related models, ordered by ForeignKey dependencies
+"""
+import random, zlib
+from collections import defaultdict
+from multiprocessing import Pool
+
+from django.core.management.color import no_style
+from django.db import connections, models, transaction
+from django.db.models import Max, Q
+
+from django_any import xunit
+from django_any.models import logger, _any_models, related_objects, unique_values
+
+
+def _label(model_cls):
+    return '%s.%s' % (model_cls._meta.app_label, model_cls._meta.object_name)
+
+
+class Populator(object):
+    """
+    Populates models with given rows counts, parents first, level by level.
+
+    ForeignKeys to the populated models are selected from already
+    created parents rows, instead of creation of new parent per
+    row. Cycles are broken by nullable ForeignKeys, filled afterwards
+    by few range updates, only for rows created by the populator
+    """
+    groups = 100
+
+    def __init__(self, counts, batch_size=1000, raw=False, progress=None):
+        self.counts = dict(counts)
+        self.batch_size = batch_size
+        self.raw = raw
+        self.progress = progress
+        self.keys = {}
+        self.offsets = {}
+        self.before = {}
+        self.starts = {}
+        self.kept = {}
+        self.levels, self.deferred = self.order()
+
+    def relations(self, model_cls):
+        """
+        ForeignKey and OneToOne fields of the model, referencing
+        populated models
+        """
+        return [field for field in model_cls._meta.fields \
+                if isinstance(field, models.ForeignKey) and \
+                not field.rel.parent_link and \
+                field.rel.to in self.counts]
+
+    def order(self):
+        """
+        Returns models grouped by levels in dependencies order, and
+        (model, field) list of nullable ForeignKeys deferred to break cycles
+        """
+        edges = dict([(model_cls, self.relations(model_cls)) \
+                      for model_cls in self.counts])
+        levels, deferred, done = [], [], set()
+
+        while len(done) < len(edges):
+            level = [model_cls for model_cls, fields in edges.iteritems() \
+                     if model_cls not in done and \
+                     all([field.rel.to in done for field in fields])]
+
+            if not level:
+                cycle = sorted([(_label(model_cls), field.name, model_cls, field) \
+                                for model_cls, fields in edges.iteritems() \
+                                if model_cls not in done \
+                                for field in fields \
+                                if field.rel.to not in done])
+                nullable = [(model_cls, field) for _, _, model_cls, field in cycle \
+                            if field.null]
+                if not nullable:
+                    raise TypeError("Can't populate not nullable ForeignKeys cycle: %s" \
+                                    % ', '.join(['%s.%s' % label[:2] for label in cycle]))
+                model_cls, field = nullable[0]
+                edges[model_cls].remove(field)
+                deferred.append((model_cls, field))
+                continue
+
+            levels.append(sorted(level, key=_label))
+            done.update(level)
+
+        return levels, deferred
+
+    def deferred_models(self):
+        return set([model_cls for model_cls, _ in self.deferred])
+
+    def related_keys(self, field):
+        """
+        Returns list of all values the field could reference
+        """
+        related = field.rel.get_related_field()
+        key = (field.rel.to, related.attname)
+        try:
+            return self.keys[key]
+        except KeyError:
+            values = list(field.rel.to._default_manager.order_by(related.attname) \
+                              .values_list(related.attname, flat=True))
+            if not values:
+                raise TypeError("No %s objects to reference by %s" \
+                                % (_label(field.rel.to), field.name))
+            return self.keys.setdefault(key, values)
+
+    def stub(self, field, value):
+        return field.rel.to(**{field.rel.get_related_field().attname: value})
+
+    def free_keys(self, model_cls, field):
+        """
+        Returns iterator over values not referenced yet by OneToOne field,
+        starting from the model offset. Only rows with primary key
+        `before` the model bound are looked at, if it is set
+        """
+        rows = model_cls._default_manager.exclude(**{'%s__isnull' % field.name: True})
+        if model_cls in self.before:
+            rows = rows.filter(pk__lt=self.before[model_cls])
+        used = set(rows.values_list(field.name, flat=True))
+        free = [value for value in self.related_keys(field) if value not in used]
+        return iter(free[self.offsets.get(model_cls, 0):])
+
+    def selector(self, model_cls, field):
+        """
+        Returns select(count) function for the field values
+        """
+        if isinstance(field, models.OneToOneField):
+            free = self.free_keys(model_cls, field)
+            def select(count):
+                values = [self.stub(field, value) for _, value in zip(xrange(0, count), free)]
+                if len(values) < count:
+                    raise TypeError("Not enough %s objects for OneToOne %s" \
+                                    % (_label(field.rel.to), field.name))
+                return values
+        else:
+            keys = self.related_keys(field)
+            def select(count):
+                return [self.stub(field, keys[index]) \
+                        for index in xunit.any_index_batch(count, len(keys))]
+        return select
+
+    def create(self, model_cls, count=None, columns=None):
+        """
+        Creates model rows, `count` and `columns` selectors
+        could be overridden
+        """
+        if count is None:
+            count = self.counts[model_cls]
+        if not count:
+            return 0
+
+        deferred = [field.name for deferred_cls, field in self.deferred \
+                    if deferred_cls is model_cls]
+        kwargs = dict([(name, None) for name in deferred])
+        selectors = dict([(field.name, self.selector(model_cls, field)) \
+                          for field in self.relations(model_cls) \
+                          if field.name not in kwargs])
+        selectors.update(columns or {})
+        progress = None
+        if self.progress:
+            progress = lambda created: self.progress(model_cls, created, count)
+        return _any_models(model_cls, count, self.batch_size, self.raw,
+                           kwargs, selectors, collect=False, exclude=deferred,
+                           progress=progress)
+
+    def record(self, model_cls):
+        """
+        Records rows existing before the model rows creation, their
+        deferred ForeignKeys are kept as is. Auto primary key start
+        bounds created rows, otherwise existing keys are kept
+        """
+        start = _next_pk(model_cls)
+        if start is not None:
+            self.starts[model_cls] = start
+            return
+
+        empty = Q()
+        for deferred_cls, field in self.deferred:
+            if deferred_cls is model_cls:
+                empty |= Q(**{'%s__isnull' % field.name: True})
+        self.kept[model_cls] = set(model_cls._default_manager.filter(empty) \
+                                       .values_list('pk', flat=True))
+
+    def assign(self, model_cls, field):
+        """
+        Fills deferred field of not filled yet rows, created by
+        the populator.
+
+        Rows are splitted to `groups` primary key ranges, each range
+        references single parent
+        """
+        manager = model_cls._default_manager
+        empty = manager.filter(**{'%s__isnull' % field.name: True})
+        if model_cls in self.starts:
+            empty = empty.filter(pk__gte=self.starts[model_cls])
+        kept = self.kept.get(model_cls)
+        pks = [pk for pk in empty.order_by('pk').values_list('pk', flat=True) \
+               if not kept or pk not in kept]
+
+        if isinstance(field, models.OneToOneField):
+            free = self.free_keys(model_cls, field)
+            for pk, value in zip(pks, free):
+                manager.filter(pk=pk).update(**{field.name: self.stub(field, value)})
+            return
+
+        if not pks:
+            return
+
+        keys = self.related_keys(field)
+        groups = min(self.groups, len(pks))
+        indexes = xunit.any_index_batch(groups, len(keys))
+        chunk = 500
+        for group, index in enumerate(indexes):
+            start, stop = len(pks) * group / groups, len(pks) * (group + 1) / groups
+            if kept:
+                # kept rows could be inside of the range
+                rows = [manager.filter(pk__in=pks[offset:min(offset + chunk, stop)]) \
+                        for offset in xrange(start, stop, chunk)]
+            else:
+                rows = [empty.filter(pk__gte=pks[start], pk__lte=pks[stop - 1])]
+            for queryset in rows:
+                queryset.update(**{field.name: self.stub(field, keys[index])})
+
+    def populate(self):
+        """
+        Creates rows, returns {model: created count}
+
+        progress(model, created, count) is called after each batch
+        """
+        created = {}
+        for number, level in enumerate(self.levels):
+            logger.info('Level %d: %s', number, ', '.join([_label(model_cls) \
+                                                         for model_cls in level]))
+            for model_cls in level:
+                if model_cls in self.deferred_models():
+                    self.record(model_cls)
+                created[model_cls] = self.create(model_cls)
+            # new rows could be referenced by next levels
+            self.keys = {}
+
+        for model_cls, field in self.deferred:
+            self.assign(model_cls, field)
+        return created
+
+
+def populate(counts, batch_size=1000, raw=False, progress=None):
+    """
+    Creates {model: count} rows of the models, see Populator
+    """
+    return Populator(counts, batch_size, raw, progress).populate()
+
+
+def derive_seed(seed, level, index):
+    """
+    Worker random seed, same for the same (seed, level, worker index)
+    """
+    return zlib.crc32('%s:%s:%s' % (seed, level, index)) & 0xffffffff
+
+
+def worker_share(count, index, workers):
+    """
+    Returns (offset, count) of the worker part of rows
+    """
+    offset = count * index / workers
+    return offset, count * (index + 1) / workers - offset
+
+
+def _next_pk(model_cls):
+    pk = model_cls._meta.pk
+    if not isinstance(pk, models.fields.AutoField):
+        return None
+    last = model_cls._default_manager.aggregate(last=Max(pk.name))['last']
+    return (last or 0) + 1
+
+
+def _init_worker():
+    """
+    Forked process should not share parent db connections and caches
+    """
+    for connection in connections.all():
+        connection.close()
+    related_objects.reset()
+    unique_values.reset()
+
+
+def _populate_share(args):
+    """
+    Creates worker part of the level rows, with primary keys
+    from the worker range
+    """
+    counts, batch_size, raw, seed, level, index, workers, starts = args
+    unique_values.partition = (index, workers)
+
+    populator = Populator(counts, batch_size, raw)
+    created = {}
+    with xunit.rng_stream(random.Random(derive_seed(seed, level, index))):
+        for model_cls in populator.levels[level]:
+            offset, count = worker_share(counts[model_cls], index, workers)
+            populator.offsets[model_cls] = offset
+            columns = {}
+            if starts.get(model_cls) is not None:
+                populator.before[model_cls] = starts[model_cls]
+                pks = iter(xrange(starts[model_cls] + offset,
+                                  starts[model_cls] + offset + count))
+                columns[model_cls._meta.pk.name] = \
+                    lambda size, pks=pks: [pk for _, pk in zip(xrange(0, size), pks)]
+            created[model_cls] = populator.create(model_cls, count, columns)
+    return created
+
+
+def _populate_levels(populator, workers, seed, map_shares, progress=None):
+    """
+    Creates all levels rows, shares of each level are created
+    by map_shares(_populate_share, shares) in parallel
+    """
+    counts = populator.counts
+    created = defaultdict(int)
+    for level, level_models in enumerate(populator.levels):
+        logger.info('Level %d: %s', level, ', '.join([_label(model_cls) \
+                                                    for model_cls in level_models]))
+        starts = dict([(model_cls, _next_pk(model_cls)) for model_cls in level_models])
+        for model_cls in populator.deferred_models().intersection(level_models):
+            populator.record(model_cls)
+        shares = [(counts, populator.batch_size, populator.raw, seed, level, index,
+                   workers, starts) for index in xrange(0, workers)]
+        for result in map_shares(_populate_share, shares):
+            for model_cls, count in result.iteritems():
+                created[model_cls] += count
+                if progress and count:
+                    progress(model_cls, created[model_cls], counts[model_cls])
+    return dict(created)
+
+
+def _finish_populate(populator, seed):
+    """
+    Resets sequences after explicit primary keys inserts, and
+    fills deferred ForeignKeys from the seed derived random stream
+    """
+    # explicit primary keys don't advance sequences on some backends
+    for model_cls in populator.counts:
+        connection = connections[model_cls._default_manager.db]
+        cursor = connection.cursor()
+        for statement in connection.ops.sequence_reset_sql(no_style(), [model_cls]):
+            cursor.execute(statement)
+        transaction.commit_unless_managed(using=connection.alias)
+
+    with xunit.rng_stream(random.Random(derive_seed(seed, 'deferred', 0))):
+        for model_cls, field in populator.deferred:
+            populator.assign(model_cls, field)
+
+
+def parallel_populate(counts, workers, batch_size=1000, raw=False, seed=None,
+                      progress=None):
+    """
+    Creates {model: count} rows by `workers` processes, level by level.
+
+    Each worker has own db connection, random seed derived from `seed`,
+    own primary keys range and own unique values partition, so the same
+    (seed, workers) produces the same data. progress(model, created, count)
+    is called after each worker share is done
+    """
+    populator = Populator(counts, batch_size, raw)
+    if raw:
+        outside = ['%s.%s' % (_label(model_cls), field.name) \
+                   for model_cls in counts for field in model_cls._meta.fields \
+                   if isinstance(field, models.ForeignKey) and \
+                   not field.rel.parent_link and field.rel.to not in counts]
+        if outside:
+            raise TypeError("Parallel raw population requires all related models "
+                            "to be populated: %s" % ', '.join(outside))
+    if seed is None:
+        seed = xunit.get_rng().getrandbits(32)
+
+    for connection in connections.all():
+        connection.close()
+    pool = Pool(workers, _init_worker)
+    try:
+        created = _populate_levels(populator, workers, seed, pool.imap_unordered, progress)
+    finally:
+        pool.close()
+        pool.join()
+
+    _finish_populate(populator, seed)
+    return created
@@ -96,13 +96,13 @@ def with_seed(seed):
 
 def set_seed(func, seed=None):
     """
-    Set randon seed before executing function. If seed is 
-    not provided current timestamp used
+    Executes function with own random stream, created from the seed.
+    If seed is not provided current timestamp used
     """
     def _wrapper(self, seed=seed, *args, **kwargs):
         self.__django_any_seed = seed if seed else int(time.time()*1000)
-        random.seed(self.__django_any_seed)
-        return func(self, *args, **kwargs)
+        with xunit.rng_stream(random.Random(self.__django_any_seed)):
+            return func(self, *args, **kwargs)
     return _wrapper
 
 
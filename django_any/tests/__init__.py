@@ -14,6 +14,7 @@ def suite():
 
     result.addTest(doctest.DocTestSuite('django_any.xunit'))
     result.addTest(doctest.DocTestSuite('django_any.forms'))
+    result.addTest(doctest.DocTestSuite('django_any.lorem'))
 
     for filename in glob(os.path.join(TESTS_ROOT, '*.py')):
         if filename.endswith('__init__.py'):
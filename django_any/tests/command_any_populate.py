@@ -0,0 +1,48 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+any_populate management command
+"""
+from StringIO import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import models
+from django.test import TestCase
+from django_any.management.commands.any_populate import Command
+
+
+class CommandParent(models.Model):
+    name = models.CharField(max_length=5)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class CommandChild(models.Model):
+    parent = models.ForeignKey(CommandParent)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class AnyPopulateCommand(TestCase):
+    def populate(self, *args, **options):
+        output = StringIO()
+        call_command('any_populate', *args, **dict(options, stdout=output))
+        return output.getvalue()
+
+    def test_populate_and_resume(self):
+        output = self.populate('django_any.CommandParent=3', 'django_any.CommandChild=10',
+                               batch_size=4, seed=1)
+        self.assertTrue('CommandChild: 8/10 (80%)' in output)
+        self.assertEqual(3, CommandParent.objects.count())
+        self.assertEqual(10, CommandChild.objects.count())
+
+        output = self.populate('django_any.CommandParent=3', 'django_any.CommandChild=15')
+        self.assertTrue('CommandChild: 10 rows exists, 5 to create' in output)
+        self.assertEqual(3, CommandParent.objects.count())
+        self.assertEqual(15, CommandChild.objects.count())
+
+    def test_wrong_arguments(self):
+        command = Command()
+        self.assertRaises(CommandError, command.parse_targets, ['django_any.CommandParent'])
+        self.assertRaises(CommandError, command.parse_targets, ['django_any.Missing=1'])
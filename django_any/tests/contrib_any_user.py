@@ -1,6 +1,6 @@
 # -*- coding: utf-8; mode: django -*-
 from django.db import models
-from django.contrib.auth.models import User
+from django.contrib.auth.models import User, Group
 from django.test import TestCase
 from django_any import any_model
 from django_any.contrib.auth import any_user
@@ -30,3 +30,14 @@ class AnyUser(TestCase):
         self.assertTrue(user.has_perm('django_any.delete_custompermission'))
         self.assertFalse(user.has_perm('django_any.change_custompermission'))
 
+
+    def test_create_with_groups(self):
+        Group.objects.create(name='editors')
+        Group.objects.create(name='admins')
+        user = any_user(groups=['editors', 'admins'])
+
+        self.assertEqual(set(['editors', 'admins']),
+                         set(user.groups.values_list('name', flat=True)))
+
+    def test_missing_group(self):
+        self.assertRaises(Group.DoesNotExist, any_user, groups=['missing'])
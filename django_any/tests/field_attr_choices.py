@@ -39,3 +39,16 @@ class AttrChoices(TestCase):
 
         self.assertTrue(result in ['vinyl', 'cd', 'vhs', 'dvd', 'unknown'])
 
+
+    def test_reassigned_choices_used(self):
+        """
+        Cached choices keys are dropped when choices reassigned
+        """
+        from django import forms
+        from django_any import any_form_field
+
+        field = forms.ChoiceField(choices=[('old', 'Old')])
+        self.assertEqual('old', any_form_field(field))
+
+        field.choices = [('new', 'New')]
+        self.assertEqual('new', any_form_field(field))
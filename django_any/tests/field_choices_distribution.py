@@ -0,0 +1,45 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Choices selection with skewed distributions
+"""
+from django import forms
+from django.db import models
+from django.test import TestCase
+from django_any import any_field, any_form_field
+
+CHOICES = [('A', 'a'), ('B', 'b'), ('C', 'c')]
+
+
+class ChoicesDistribution(TestCase):
+    def test_explicit_weights(self):
+        field = models.CharField(max_length=1, choices=CHOICES)
+        results = set([any_field(field, distribution={'B': 1}) for _ in xrange(0, 20)])
+        self.assertEqual(set(['B']), results)
+
+    def test_zipf_prefers_first_choice(self):
+        field = models.CharField(max_length=1, choices=CHOICES)
+        results = [any_field(field, distribution=('zipf', 3)) for _ in xrange(0, 200)]
+        self.assertTrue(results.count('A') > results.count('C'))
+
+    def test_form_choices_weights(self):
+        field = forms.ChoiceField(choices=CHOICES)
+        self.assertEqual('C', any_form_field(field, distribution=[0, 0, 1]))
+
+    def test_sampler_cached_per_distribution(self):
+        field = models.CharField(max_length=1, choices=CHOICES)
+        distribution = {'A': 1, 'C': 1}
+        any_field(field, distribution=distribution)
+        sampler = field._django_any_sampler[2]
+        any_field(field, distribution=distribution)
+        self.assertTrue(sampler is field._django_any_sampler[2])
+
+        self.assertEqual('B', any_field(field, distribution={'B': 1}))
+        self.assertFalse(sampler is field._django_any_sampler[2])
+
+    def test_changed_distribution_noticed(self):
+        field = models.CharField(max_length=1, choices=CHOICES)
+        distribution = {'A': 1}
+        self.assertEqual('A', any_field(field, distribution=distribution))
+
+        distribution['A'], distribution['C'] = 0, 1
+        self.assertEqual('C', any_field(field, distribution=distribution))
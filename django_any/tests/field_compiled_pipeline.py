@@ -0,0 +1,26 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Value generators are compiled once per field
+"""
+from django.db import models
+from django.test import TestCase
+from django_any import any_field
+from django_any.models import any_char_field
+
+
+class CompiledPipeline(TestCase):
+    def test_plain_field_calls_generator_directly(self):
+        field = models.CharField(max_length=5)
+        self.assertTrue(any_field.compile(field) is any_char_field)
+
+    def test_pipeline_cached_on_field(self):
+        field = models.CharField(max_length=5, choices=[('A', 'a')])
+        pipeline = any_field.compile(field)
+
+        self.assertFalse(pipeline is any_char_field)
+        self.assertTrue(pipeline is any_field.compile(field))
+        self.assertEqual('A', any_field(field))
+
+    def test_isnull_argument_honoured(self):
+        field = models.CharField(max_length=5)
+        self.assertEqual(None, any_field(field, isnull=True))
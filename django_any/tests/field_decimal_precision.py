@@ -0,0 +1,22 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Decimal values are exact for any digits count
+"""
+from decimal import Decimal
+from django.db import models
+from django.test import TestCase
+from django_any import any_field
+
+
+class DecimalPrecision(TestCase):
+    def test_high_precision_value_valid(self):
+        field = models.DecimalField(max_digits=24, decimal_places=6)
+        for _ in xrange(0, 20):
+            value = any_field(field)
+            field.clean(value, None)
+            self.assertEqual(-6, value.as_tuple().exponent)
+
+    def test_bounds_respected(self):
+        field = models.DecimalField(max_digits=5, decimal_places=2)
+        value = any_field(field, min_value=Decimal('1.005'), max_value=Decimal('1.01'))
+        self.assertEqual('1.01', str(value))
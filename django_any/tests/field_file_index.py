@@ -0,0 +1,30 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+File fields values are selected from the cached directory index
+"""
+import os
+from django.conf import settings
+from django.db import models
+from django.test import TestCase
+from django_any import any_field
+
+
+class FileIndex(TestCase):
+    def test_file_field_lazy_open(self):
+        field = models.FileField(upload_to='sample_subdir')
+        result = any_field(field)
+
+        self.assertEqual('sample_subdir/sample_file.txt', result.name)
+        self.assertTrue(result._file is None)
+
+    def test_nearest_file_lookup(self):
+        field = models.FilePathField(path=settings.MEDIA_ROOT, recursive=True)
+        result = any_field(field)
+
+        self.assertEqual(os.path.join(settings.MEDIA_ROOT, 'sample_subdir', 'sample_file.txt'),
+                         result)
+
+    def test_no_matched_files(self):
+        field = models.FilePathField(path=settings.MEDIA_ROOT, match=r'.*\.png$',
+                                     recursive=True, null=True)
+        self.assertEqual(None, any_field(field))
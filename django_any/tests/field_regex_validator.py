@@ -0,0 +1,52 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Values for fields guarded by RegexValidator match the regex
+"""
+import re
+from django.core.validators import RegexValidator
+from django.db import models
+from django.test import TestCase
+from django_any import any_field, any_model
+
+
+class RegexGuarded(models.Model):
+    phone = models.CharField(max_length=20, validators=[RegexValidator(r'^\+\d{1,3} \d{3}-\d{4}$')])
+    sku = models.CharField(max_length=10)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class RegexValues(TestCase):
+    def test_regex_validator_detected(self):
+        result = any_model(RegexGuarded)
+        self.assertTrue(re.match(r'^\+\d{1,3} \d{3}-\d{4}$', result.phone))
+
+    def test_regex_argument(self):
+        result = any_model(RegexGuarded, sku__regex=r'^[A-Z]{3}\d{5}$')
+        self.assertTrue(re.match(r'^[A-Z]{3}\d{5}$', result.sku))
+
+    def test_default_validators_ignored(self):
+        result = any_field(models.SlugField())
+        self.assertTrue(len(result) >= 3)
+
+    def test_max_length_respected(self):
+        field = models.CharField(max_length=6, validators=[RegexValidator(r'^[a-z]+(-[a-z]+)*$')])
+        for _ in xrange(0, 50):
+            result = any_field(field)
+            self.assertTrue(len(result) <= 6)
+            self.assertTrue(re.match(r'^[a-z]+(-[a-z]+)*$', result))
+
+    def test_regex_flags(self):
+        regex = re.compile(r'^ \d{3} - \d{2} $', re.VERBOSE)
+        result = any_field(models.CharField(max_length=10, validators=[RegexValidator(regex)]))
+        self.assertTrue(regex.match(result))
+
+    def test_lookaround_validator_skipped(self):
+        field = models.CharField(max_length=5, validators=[RegexValidator(r'^(?!0)\d{3}$')])
+        result = any_field(field)
+        self.assertTrue(1 <= len(result) <= 5)
+        self.assertFalse(re.match(r'^\d{3}$', result))
+
+    def test_lookaround_argument_rejected(self):
+        self.assertRaises(TypeError, any_model, RegexGuarded, sku__regex=r'^(?!0)\d{3}$')
@@ -0,0 +1,29 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Custom field subclasses use nearest registered base generator
+"""
+from django.db import models
+from django.test import TestCase
+from django_any import any_field
+
+
+class UpperCharField(models.CharField):
+    pass
+
+
+class LowerCharField(UpperCharField):
+    pass
+
+
+class SubclassDispatch(TestCase):
+    def test_base_generator_used(self):
+        result = any_field(UpperCharField(max_length=5))
+        self.assertEqual(str, type(result))
+        self.assertTrue(1 <= len(result) <= 5)
+
+    def test_nearest_registration_wins(self):
+        any_field.register(UpperCharField, lambda field, **kwargs: 'UPPER')
+
+        self.assertEqual('UPPER', any_field(UpperCharField(max_length=5)))
+        self.assertEqual('UPPER', any_field(LowerCharField(max_length=5)))
+        self.assertNotEqual('UPPER', any_field(models.CharField(max_length=5)))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Grouping created objects into transactions
+"""
+from django.db import models, IntegrityError
+from django.test import TestCase, TransactionTestCase
+from django_any import any_model, any_models, batch
+
+
+class BatchModel(models.Model):
+    name = models.CharField(max_length=5)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class BatchFailingModel(models.Model):
+    name = models.CharField(max_length=5)
+
+    failures = 0
+
+    class Meta:
+        app_label = 'django_any'
+
+    def save(self, *args, **kwargs):
+        if BatchFailingModel.failures:
+            BatchFailingModel.failures -= 1
+            raise IntegrityError('column name is not unique')
+        super(BatchFailingModel, self).save(*args, **kwargs)
+
+
+class BatchCreation(TestCase):
+    def test_commit_per_size(self):
+        with batch(size=3) as current:
+            for _ in xrange(0, 4):
+                any_model(BatchModel)
+            self.assertEqual(1, current.pending)
+            any_models(BatchModel, 5)
+            self.assertEqual(0, current.pending)
+        self.assertEqual(9, BatchModel.objects.count())
+
+    def test_retry_inside_batch(self):
+        BatchFailingModel.failures = 2
+        with batch():
+            result = any_model(BatchFailingModel)
+        self.assertEqual(0, BatchFailingModel.failures)
+        self.assertTrue(BatchFailingModel.objects.filter(pk=result.pk).exists())
+
+
+class BatchRollback(TransactionTestCase):
+    def test_rollback_on_error(self):
+        try:
+            with batch(size=10):
+                any_model(BatchModel)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(0, BatchModel.objects.count())
+
+    def test_bulk_rollback_on_error(self):
+        try:
+            with batch(size=100):
+                any_model(BatchModel)
+                any_models(BatchModel, 5)
+                any_models(BatchModel, 5, raw=True)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(0, BatchModel.objects.count())
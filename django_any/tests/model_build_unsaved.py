@@ -0,0 +1,53 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Build model instances without db access
+"""
+from django.contrib.auth.models import User
+from django.db import models
+from django.test import TestCase
+from django_any import any_model
+from django_any.contrib.auth import any_user
+
+
+class BuildParent(models.Model):
+    name = models.CharField(max_length=5, unique=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class BuildChild(models.Model):
+    parent = models.ForeignKey(BuildParent)
+    email = models.EmailField()
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class BuildUnsaved(TestCase):
+    def test_build_without_queries(self):
+        with self.assertNumQueries(0):
+            result = any_model.build(BuildChild)
+
+        self.assertEqual(type(result), BuildChild)
+        self.assertTrue(result.pk is None)
+        self.assertTrue('@' in result.email)
+        self.assertEqual(type(result.parent), BuildParent)
+        self.assertTrue(result.parent.pk is None)
+        self.assertEqual(0, BuildParent.objects.count())
+
+    def test_skip_validation(self):
+        with self.assertNumQueries(0):
+            result = any_model.build(BuildChild, validate=False,
+                                     parent__name='test')
+        self.assertEqual('test', result.parent.name)
+
+    def test_unsaved_user(self):
+        with self.assertNumQueries(0):
+            user = any_user(password='secret', unsaved=True)
+        self.assertTrue(user.pk is None)
+        self.assertTrue(user.check_password('secret'))
+
+    def test_user_saved_once(self):
+        user = any_user(password='secret')
+        self.assertTrue(User.objects.get(pk=user.pk).check_password('secret'))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Batch creation of many model instances
+"""
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.test import TestCase
+from django_any import any_models
+from django_any.models import _raw_save
+
+
+class BulkRelated(models.Model):
+    name = models.CharField(max_length=5)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class BulkModel(models.Model):
+    name = models.CharField(max_length=5)
+    related = models.ForeignKey(BulkRelated)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class BulkSaveOverride(models.Model):
+    name = models.CharField(max_length=5)
+    created = models.DateField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+    def save(self, *args, **kwargs):
+        raise AssertionError('save() should not be called')
+
+
+class BulkInherited(BulkRelated):
+    class Meta:
+        app_label = 'django_any'
+
+
+class BulkCreation(TestCase):
+    def test_bulk_creation_succeed(self):
+        result = any_models(BulkModel, 25, batch_size=10)
+
+        self.assertEqual(25, len(result))
+        self.assertEqual(25, BulkModel.objects.count())
+        self.assertEqual(25, BulkRelated.objects.count())
+        self.assertTrue(all([instance.pk for instance in result]))
+
+    def test_bulk_partial_specification(self):
+        result = any_models(BulkModel, 5, name='test', related__name='rel')
+
+        self.assertEqual(5, BulkModel.objects.filter(name='test').count())
+        self.assertEqual(set(['rel']),
+                         set([instance.related.name for instance in result]))
+
+    def test_raw_insert(self):
+        result = any_models(BulkModel, 25, batch_size=10, raw=True)
+
+        self.assertEqual(25, BulkModel.objects.count())
+        self.assertEqual(25, BulkRelated.objects.count())
+        self.assertEqual(sorted([instance.pk for instance in result]),
+                         sorted(BulkModel.objects.values_list('pk', flat=True)))
+        for instance in result:
+            self.assertEqual(instance.name, BulkModel.objects.get(pk=instance.pk).name)
+
+    def test_raw_insert_keys(self):
+        BulkRelated.objects.create(pk=50, name='late')
+        instances = [BulkRelated(name='a'), BulkRelated(pk=100, name='b'),
+                     BulkRelated(name='c')]
+        _raw_save(BulkRelated, instances)
+
+        self.assertEqual(100, instances[1].pk)
+        for instance in instances:
+            self.assertEqual(instance.name, BulkRelated.objects.get(pk=instance.pk).name)
+        self.assertTrue(BulkRelated.objects.create(name='next').pk > 100)
+
+    def test_raw_insert_batched(self):
+        # first row, keys range and the rest rows of parents and children
+        with self.assertNumQueries(6):
+            result = any_models(BulkModel, 10, batch_size=10, raw=True)
+        self.assertEqual(sorted([instance.pk for instance in result]),
+                         sorted(BulkModel.objects.values_list('pk', flat=True)))
+
+    def test_raw_insert_skips_save(self):
+        any_models(BulkSaveOverride, 5, raw=True)
+        self.assertEqual(5, BulkSaveOverride.objects.filter(created__isnull=False).count())
+
+    def test_insert_skips_save(self):
+        result = any_models(BulkSaveOverride, 5)
+        self.assertEqual(5, BulkSaveOverride.objects.filter(created__isnull=False).count())
+        self.assertTrue(all([instance.pk for instance in result]))
+
+    def test_raw_insert_inherited_fails(self):
+        self.assertRaises(TypeError, any_models, BulkInherited, 1, raw=True)
+
+    def test_related_validated_by_batch(self):
+        # parents and rows inserts by first row, keys range and the rest
+        # rows, and single related values check
+        with self.assertNumQueries(7):
+            any_models(BulkModel, 10, batch_size=10)
+
+    def test_missing_related_fails(self):
+        self.assertRaises(ValidationError, any_models, BulkModel, 2,
+                          related=BulkRelated(pk=999))
@@ -0,0 +1,38 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Model fields traversal is compiled once per model class
+"""
+from django.db import models
+from django.test import TestCase
+from django_any import any_field, any_model
+from django_any.models import get_fill_plan
+
+
+class PlanField(models.CharField):
+    pass
+
+
+class PlanModel(models.Model):
+    name = models.CharField(max_length=5)
+    code = PlanField(max_length=5)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class FillPlanCache(TestCase):
+    def test_plan_cached(self):
+        self.assertTrue(get_fill_plan(PlanModel) is get_fill_plan(PlanModel))
+
+    def test_primary_key_skipped(self):
+        plan = get_fill_plan(PlanModel)
+        skipped = [name for name, _, _, skip in plan.fields if skip]
+        self.assertEqual(['id'], skipped)
+
+    def test_plan_invalidated_on_registration(self):
+        plan = get_fill_plan(PlanModel)
+
+        any_field.register(PlanField, lambda field, **kwargs: 'plan')
+
+        self.assertFalse(plan is get_fill_plan(PlanModel))
+        self.assertEqual('plan', any_model(PlanModel).code)
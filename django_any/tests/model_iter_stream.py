@@ -0,0 +1,65 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Lazy stream of generated model instances
+"""
+from itertools import islice
+from django.db import models
+from django.test import TestCase
+from django_any import iter_any_model
+from django_any.models import unique_values
+
+
+class StreamParent(models.Model):
+    name = models.CharField(max_length=5)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class StreamChild(models.Model):
+    parent = models.ForeignKey(StreamParent)
+    number = models.IntegerField(unique=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class IterAnyModel(TestCase):
+    def test_chunks(self):
+        with self.assertNumQueries(0):
+            chunks = list(iter_any_model(StreamChild, 5, chunk_size=2))
+
+        self.assertEqual([2, 2, 1], [len(chunk) for chunk in chunks])
+        for chunk in chunks:
+            for instance in chunk:
+                self.assertEqual(type(instance), StreamChild)
+                self.assertTrue(instance.pk is None)
+                self.assertTrue(instance.parent.pk is None)
+
+        numbers = set([instance.number for chunk in chunks for instance in chunk])
+        self.assertEqual(5, len(numbers))
+
+    def test_unbounded_dicts(self):
+        stream = iter_any_model(StreamParent, chunk_size=3, as_dict=True,
+                                name='test')
+        chunks = list(islice(stream, 4))
+
+        self.assertEqual(4, len(chunks))
+        self.assertEqual({'id': None, 'name': 'test'}, chunks[-1][-1])
+        self.assertEqual(0, StreamParent.objects.count())
+
+    def test_own_unique_tracker(self):
+        stream = iter_any_model(StreamChild, chunk_size=10)
+        numbers = [instance.number for chunk in islice(stream, 5) for instance in chunk]
+
+        self.assertEqual(50, len(set(numbers)))
+        self.assertFalse((StreamChild, ('number',)) in unique_values.issued)
+
+    def test_parents_values(self):
+        row = iter_any_model(StreamChild, 1, as_dict=True, parent__name='test').next()[0]
+
+        self.assertEqual(set(['id', 'parent_id', 'parent__id', 'parent__name', 'number']),
+                         set(row.keys()))
+        self.assertEqual(None, row['parent_id'])
+        self.assertEqual('test', row['parent__name'])
+        self.assertTrue(isinstance(row['number'], (int, long)))
@@ -0,0 +1,118 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Partitioning of the parallel population between workers
+"""
+from django.db import models
+from django.test import TestCase
+from django_any.models import unique_values
+from django_any.populate import Populator, derive_seed, worker_share, \
+    _populate_levels, _finish_populate
+
+
+class ParallelParent(models.Model):
+    code = models.IntegerField(unique=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class ParallelChild(models.Model):
+    parent = models.ForeignKey(ParallelParent)
+    name = models.CharField(max_length=10, unique=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class ParallelCompany(models.Model):
+    ceo = models.ForeignKey('ParallelEmployee', null=True, related_name='+')
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class ParallelEmployee(models.Model):
+    company = models.ForeignKey(ParallelCompany)
+    manager = models.ForeignKey('self', null=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class ParallelPartition(TestCase):
+    def tearDown(self):
+        unique_values.partition = None
+        unique_values.reset()
+
+    def test_shares(self):
+        self.assertEqual([(0, 3), (3, 3), (6, 4)],
+                         [worker_share(10, index, 3) for index in xrange(0, 3)])
+
+    def test_derived_seeds(self):
+        self.assertEqual(derive_seed(1, 0, 1), derive_seed(1, 0, 1))
+        self.assertNotEqual(derive_seed(1, 0, 0), derive_seed(1, 0, 1))
+        self.assertNotEqual(derive_seed(1, 0, 0), derive_seed(1, 1, 0))
+
+    def test_unique_partition(self):
+        unique_values.partition = (1, 4)
+        owned = len([value for value in xrange(0, 1000) if unique_values.owns((value,))])
+        self.assertTrue(150 < owned < 350)
+
+    def run_workers(self, counts, seed, workers, progress=None):
+        """
+        Runs workers shares one by one, in this process
+        """
+        def map_shares(function, shares):
+            for share in shares:
+                yield function(share)
+                unique_values.reset()
+
+        populator = Populator(counts, 10)
+        created = _populate_levels(populator, workers, seed, map_shares, progress)
+        _finish_populate(populator, seed)
+        return created
+
+    def test_workers_partitions(self):
+        self.run_workers({ParallelParent: 10, ParallelChild: 25}, 1, 3)
+
+        self.assertEqual(range(1, 11),
+                         list(ParallelParent.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(25, ParallelChild.objects.count())
+
+        codes = ParallelParent.objects.order_by('pk').values_list('code', flat=True)
+        owners = [index for index in xrange(0, 3) for _ in xrange(*worker_share(10, index, 3))]
+        for code, index in zip(codes, owners):
+            unique_values.partition = (index, 3)
+            self.assertTrue(unique_values.owns((code,)))
+
+    def test_same_seed_same_data(self):
+        counts = {ParallelParent: 6}
+        self.run_workers(counts, 7, 2)
+        first = list(ParallelParent.objects.order_by('pk').values_list('code', flat=True))
+        ParallelParent.objects.all().delete()
+
+        self.run_workers(counts, 7, 2)
+        second = list(ParallelParent.objects.order_by('pk').values_list('code', flat=True))
+        self.assertEqual(first, second)
+
+    def test_same_seed_same_deferred(self):
+        counts = {ParallelCompany: 3, ParallelEmployee: 30}
+        fields = lambda model_cls, name: list(model_cls.objects.order_by('pk') \
+                                              .values_list(name, flat=True))
+
+        self.run_workers(counts, 5, 3)
+        first = fields(ParallelCompany, 'ceo'), fields(ParallelEmployee, 'manager')
+        self.assertFalse(None in first[0] or None in first[1])
+        ParallelEmployee.objects.all().delete()
+        ParallelCompany.objects.all().delete()
+
+        self.run_workers(counts, 5, 3)
+        second = fields(ParallelCompany, 'ceo'), fields(ParallelEmployee, 'manager')
+        self.assertEqual(first, second)
+
+    def test_progress(self):
+        reported = []
+        created = self.run_workers({ParallelParent: 10}, 1, 3,
+                                   lambda model_cls, done, count: reported.append((done, count)))
+        self.assertEqual({ParallelParent: 10}, created)
+        self.assertEqual([(3, 10), (6, 10), (10, 10)], reported)
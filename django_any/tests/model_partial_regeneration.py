@@ -0,0 +1,76 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Only failed fields are regenerated on validation errors
+"""
+import logging
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.test import TestCase
+from django_any import any_model
+from django_any.models import logger
+
+validated = {'text': [], 'value': []}
+
+
+def record_text(value):
+    validated['text'].append(value)
+
+
+def reject_first_value(value):
+    validated['value'].append(value)
+    if len(validated['value']) == 1:
+        raise ValidationError(u'%s is rejected' % value)
+
+
+class RegenerationParent(models.Model):
+    name = models.CharField(max_length=5)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class RegenerationChild(models.Model):
+    parent = models.ForeignKey(RegenerationParent)
+    text = models.TextField(validators=[record_text])
+    value = models.PositiveIntegerField(validators=[reject_first_value])
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class RecordHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self, logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class PartialRegeneration(TestCase):
+    def setUp(self):
+        for values in validated.values():
+            del values[:]
+        self.handler = RecordHandler()
+        self.level = logger.level
+        logger.addHandler(self.handler)
+        logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        logger.removeHandler(self.handler)
+        logger.setLevel(self.level)
+
+    def test_related_objects_kept(self):
+        result = any_model(RegenerationChild)
+
+        self.assertEqual(1, RegenerationParent.objects.count())
+        self.assertEqual(result.parent, RegenerationParent.objects.get())
+
+    def test_only_failed_field_regenerated(self):
+        result = any_model(RegenerationChild)
+
+        self.assertEqual(2, len(validated['value']))
+        self.assertEqual(result.value, validated['value'][-1])
+        self.assertEqual([result.text, result.text], validated['text'])
+        self.assertTrue("RegenerationChild: created with retries {'value': 1}" \
+                        in self.handler.messages)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Bulk population of related models
+"""
+from django.db import models
+from django.test import TestCase
+from django_any.populate import Populator, populate
+
+
+class PopulateAuthor(models.Model):
+    name = models.CharField(max_length=5)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class PopulateBook(models.Model):
+    author = models.ForeignKey(PopulateAuthor)
+    title = models.CharField(max_length=10)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class PopulateProfile(models.Model):
+    author = models.OneToOneField(PopulateAuthor)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class PopulateCompany(models.Model):
+    ceo = models.ForeignKey('PopulateEmployee', null=True, related_name='+')
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class PopulateEmployee(models.Model):
+    company = models.ForeignKey(PopulateCompany)
+    manager = models.ForeignKey('self', null=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class PopulateCycle(models.Model):
+    other = models.ForeignKey('self')
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class DependencyOrder(TestCase):
+    def test_levels(self):
+        populator = Populator({PopulateBook: 1, PopulateProfile: 1, PopulateAuthor: 1})
+        self.assertEqual([[PopulateAuthor], [PopulateBook, PopulateProfile]],
+                         populator.levels)
+        self.assertEqual([], populator.deferred)
+
+    def test_nullable_cycle(self):
+        populator = Populator({PopulateCompany: 1, PopulateEmployee: 1})
+        self.assertEqual([[PopulateCompany], [PopulateEmployee]], populator.levels)
+        self.assertEqual(['ceo', 'manager'],
+                         [field.name for _, field in populator.deferred])
+
+    def test_not_nullable_cycle(self):
+        self.assertRaises(TypeError, Populator, {PopulateCycle: 1})
+
+
+class PopulateLevels(TestCase):
+    def test_parents_are_shared(self):
+        created = populate({PopulateAuthor: 5, PopulateBook: 50, PopulateProfile: 5},
+                           batch_size=20)
+
+        self.assertEqual({PopulateAuthor: 5, PopulateBook: 50, PopulateProfile: 5},
+                         created)
+        self.assertEqual(5, PopulateAuthor.objects.count())
+        self.assertEqual(50, PopulateBook.objects.count())
+        self.assertEqual(5, len(set(PopulateProfile.objects.values_list('author', flat=True))))
+
+    def test_not_enough_onetoone_parents(self):
+        self.assertRaises(TypeError, populate, {PopulateAuthor: 2, PopulateProfile: 3})
+
+    def test_deferred_fields_filled(self):
+        populate({PopulateCompany: 3, PopulateEmployee: 30}, raw=True)
+
+        self.assertEqual(0, PopulateCompany.objects.filter(ceo__isnull=True).count())
+        self.assertEqual(0, PopulateEmployee.objects.filter(manager__isnull=True).count())
+        self.assertTrue(set(PopulateEmployee.objects.values_list('company', flat=True)) \
+                        <= set(PopulateCompany.objects.values_list('pk', flat=True)))
+
+    def test_existing_rows_kept(self):
+        company = PopulateCompany.objects.create(ceo=None)
+        employee = PopulateEmployee.objects.create(company=company, manager=None)
+        populate({PopulateCompany: 2, PopulateEmployee: 10}, raw=True)
+
+        self.assertEqual(None, PopulateCompany.objects.get(pk=company.pk).ceo_id)
+        self.assertEqual(None, PopulateEmployee.objects.get(pk=employee.pk).manager_id)
+        self.assertEqual(1, PopulateCompany.objects.filter(ceo__isnull=True).count())
+        self.assertEqual(1, PopulateEmployee.objects.filter(manager__isnull=True).count())
@@ -0,0 +1,117 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+ForeignKey values could be reused instead of creation
+"""
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.test import TestCase
+from django_any import any_model, any_models
+from django_any.models import related_objects
+
+
+class PolicyParent(models.Model):
+    name = models.CharField(max_length=5)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class PolicyChild(models.Model):
+    parent = models.ForeignKey(PolicyParent)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class RelatedPolicy(TestCase):
+    def setUp(self):
+        related_objects.reset()
+        self.pool_size = related_objects.pool_size
+        related_objects.pool_size = 3
+
+    def tearDown(self):
+        related_objects.pool_size = self.pool_size
+        related_objects.reset()
+
+    def test_create_by_default(self):
+        for _ in xrange(0, 5):
+            any_model(PolicyChild)
+        self.assertEqual(5, PolicyParent.objects.count())
+
+    def test_reuse_from_pool(self):
+        for _ in xrange(0, 10):
+            any_model(PolicyChild, parent__policy='reuse')
+        self.assertEqual(3, PolicyParent.objects.count())
+
+    def test_bulk_reuse_from_pool(self):
+        any_models(PolicyChild, 10, parent__policy='reuse')
+        self.assertEqual(3, PolicyParent.objects.count())
+        self.assertEqual(10, PolicyChild.objects.count())
+
+    def test_reuse_with_explicit_weights(self):
+        children = [any_model(PolicyChild, parent__policy='reuse',
+                              parent__distribution=[0, 1]) for _ in xrange(0, 3)]
+        children += any_models(PolicyChild, 5, parent__policy='reuse',
+                               parent__distribution=[0, 1])
+
+        self.assertEqual(2, PolicyParent.objects.count())
+        self.assertEqual(1, len(set([child.parent_id for child in children])))
+
+    def test_reuse_weights_exceed_pool(self):
+        self.assertRaises(TypeError, any_model, PolicyChild, parent__policy='reuse',
+                          parent__distribution=[1, 1, 1, 1])
+
+    def test_select_existing(self):
+        parents = [any_model(PolicyParent) for _ in xrange(0, 2)]
+        children = any_models(PolicyChild, 5, parent__policy='existing')
+
+        self.assertEqual(2, PolicyParent.objects.count())
+        self.assertTrue(set([child.parent_id for child in children]) <= \
+                        set([parent.pk for parent in parents]))
+
+    def test_existing_rows_loaded(self):
+        parent = any_model(PolicyParent)
+        child = any_model(PolicyChild, parent__policy='existing')
+        self.assertEqual(parent.name, child.parent.name)
+
+        child = any_models(PolicyChild, 1, parent__policy='existing')[0]
+        self.assertFalse('_parent_cache' in child.__dict__)
+        self.assertEqual(parent.name, child.parent.name)
+
+    def outdate(self, policy):
+        """
+        Deletes cached parents, the last not cached one keeps
+        their primary keys from reuse by new rows
+        """
+        for _ in xrange(0, 3):
+            any_model(PolicyChild, parent__policy=policy)
+        last = any_model(PolicyParent)
+        PolicyChild.objects.all().delete()
+        PolicyParent.objects.exclude(pk=last.pk).delete()
+        return last
+
+    def test_outdated_keys_reloaded(self):
+        for _ in xrange(0, 3):
+            any_model(PolicyParent)
+        last = self.outdate('existing')
+        self.assertEqual(last, any_model(PolicyChild, parent__policy='existing').parent)
+
+    def test_outdated_batch_keys_dropped(self):
+        for _ in xrange(0, 3):
+            any_model(PolicyParent)
+        last = self.outdate('existing')
+        self.assertRaises(ValidationError, any_models, PolicyChild, 1, parent__policy='existing')
+        self.assertEqual(last, any_models(PolicyChild, 1, parent__policy='existing')[0].parent)
+
+    def test_outdated_pool_dropped(self):
+        self.outdate('reuse')
+        child = any_model(PolicyChild, parent__policy='reuse')
+        self.assertEqual(1, PolicyParent.objects.filter(pk=child.parent_id).count())
+
+    def test_existing_with_explicit_weights(self):
+        parents = [any_model(PolicyParent) for _ in xrange(0, 2)]
+        children = any_models(PolicyChild, 5, parent__policy='existing',
+                              parent__distribution=[0, 1])
+
+        self.assertEqual(set([parents[1].pk]),
+                         set([child.parent_id for child in children]))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Concurrent generation from many threads, without db access
+"""
+import random, threading, time
+from django import forms
+from django.db import models
+from django.test import TestCase
+from django_any import any_field, any_form_field, any_model
+from django_any.functions import ExtensionMethod
+from django_any.models import related_objects
+
+
+class ThreadedParent(models.Model):
+    name = models.CharField(max_length=15)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class ThreadedModel(models.Model):
+    parent = models.ForeignKey(ThreadedParent)
+    code = models.CharField(max_length=10, unique=True)
+    number = models.IntegerField(choices=[(1, 'one'), (2, 'two')])
+    created = models.DateTimeField()
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class ThreadedOrder(models.Model):
+    code = models.CharField(max_length=10, unique=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class ThreadedProduct(models.Model):
+    sku = models.CharField(max_length=10, unique=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class ThreadedLine(models.Model):
+    # unsaved parents are referenced by the unique field values
+    order = models.ForeignKey(ThreadedOrder, to_field='code')
+    product = models.ForeignKey(ThreadedProduct, to_field='sku')
+
+    class Meta:
+        app_label = 'django_any'
+        unique_together = ('order', 'product')
+
+
+class ThreadedField(models.CharField):
+    pass
+
+
+THREADS = 8
+ROWS = 50
+
+
+def generate(seed):
+    """
+    Returns (values, codes) generated from the seed stream
+    """
+    rng = random.Random(seed)
+    values, codes = [], []
+    for _ in xrange(0, ROWS):
+        instance = any_model.build(ThreadedModel, rng=rng)
+        codes.append(instance.code)
+        values.append((instance.parent.name, instance.number, instance.created,
+                       any_field(models.EmailField(), rng=rng),
+                       any_form_field(forms.IntegerField(min_value=1, max_value=5), rng=rng)))
+    return values, codes
+
+
+def generate_plain(seed):
+    """
+    Returns values generated from the seed stream, without unique fields
+    """
+    rng = random.Random(seed)
+    return [(any_model.build(ThreadedParent, rng=rng).name,
+             any_field(models.DateField(), rng=rng),
+             any_form_field(forms.CharField(max_length=10), rng=rng)) \
+            for _ in xrange(0, ROWS)]
+
+
+def run_threads(target, count, timeout=None):
+    errors, threads = [], []
+
+    def _wrapper(index):
+        try:
+            target(index)
+        except Exception, e:
+            errors.append(e)
+
+    for index in xrange(0, count):
+        threads.append(threading.Thread(target=_wrapper, args=(index,)))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join(timeout)
+        if thread.is_alive():
+            errors.append(AssertionError('%s is locked' % thread.name))
+    return errors
+
+
+class ThreadSafety(TestCase):
+    def test_concurrent_generation(self):
+        results = {}
+        errors = run_threads(lambda index: results.setdefault(index, generate(index)),
+                             THREADS)
+        self.assertEqual([], errors)
+
+        codes = [code for index in results for code in results[index][1]]
+        self.assertEqual(THREADS * ROWS, len(set(codes)))
+
+        for index, (values, _) in results.items():
+            self.assertEqual(ROWS, len(values))
+            for name, number, created, email, form_value in values:
+                self.assertTrue(1 <= len(name) <= 15)
+                self.assertTrue(number in (1, 2))
+                self.assertTrue('@' in email)
+                self.assertTrue(1 <= int(form_value) <= 5)
+
+    def test_same_stream_same_values(self):
+        expected = generate_plain(1)
+        results = {}
+        errors = run_threads(lambda index: results.setdefault(index, generate_plain(1)),
+                             THREADS)
+        self.assertEqual([], errors)
+        for values in results.values():
+            self.assertEqual(expected, values)
+
+    def test_unique_together_with_reused_parents(self):
+        # resets make reuse create parents, while other threads
+        # regenerate colliding pairs from the pools
+        pool_size, related_objects.pool_size = related_objects.pool_size, 10
+        done = []
+
+        def _target(index):
+            if index == 0:
+                while not done:
+                    related_objects.reset()
+                    time.sleep(0.001)
+                return
+            for _ in xrange(0, ROWS * 4):
+                any_model.build(ThreadedLine, order__policy='reuse', product__policy='reuse')
+            done.append(index)
+
+        try:
+            errors = run_threads(_target, THREADS, timeout=60)
+        finally:
+            done.append(None)
+            related_objects.pool_size = pool_size
+        self.assertEqual([], errors)
+
+    def test_registration_during_generation(self):
+        method = ExtensionMethod()
+        method.register(models.Field, lambda field, **kwargs: 'base')
+        field = ThreadedField(max_length=5)
+
+        def _target(index):
+            for number in xrange(0, 200):
+                if index == 0:
+                    method.register(type('Field%d' % number, (ThreadedField,), {}),
+                                    lambda field, **kwargs: 'new')
+                else:
+                    self.assertEqual('base', method(field))
+
+        self.assertEqual([], run_threads(_target, THREADS))
+
+    def test_dispatch_not_changed_in_place(self):
+        method = ExtensionMethod()
+        method.register(models.Field, lambda field, **kwargs: 'base')
+        dispatch = method.dispatch
+        self.assertEqual('base', method(ThreadedField(max_length=5)))
+
+        self.assertEqual({}, dispatch)
+        self.assertTrue(ThreadedField in method.dispatch)
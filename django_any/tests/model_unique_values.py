@@ -0,0 +1,50 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Unique fields values are generated without collisions
+"""
+from django.db import models
+from django.test import TestCase
+from django_any import any_model
+
+
+class UniqueCode(models.Model):
+    code = models.CharField(max_length=1, unique=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class UniqueTogether(models.Model):
+    flag = models.BooleanField()
+    level = models.PositiveSmallIntegerField(choices=[(1, 'one'), (2, 'two'), (3, 'three')])
+
+    class Meta:
+        app_label = 'django_any'
+        unique_together = [('flag', 'level')]
+
+
+class UniqueNullable(models.Model):
+    code = models.CharField(max_length=5, unique=True, null=True, blank=True)
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class UniqueValuesGeneration(TestCase):
+    def test_unique_field_values(self):
+        codes = [any_model(UniqueCode).code for _ in xrange(0, 55)]
+        self.assertEqual(55, len(set(codes)))
+
+    def test_unique_together_values(self):
+        pairs = [(instance.flag, instance.level) \
+                 for instance in [any_model(UniqueTogether) for _ in xrange(0, 4)]]
+        self.assertEqual(4, len(set(pairs)))
+
+    def test_explicit_value_checked(self):
+        any_model(UniqueCode, code='X')
+        self.assertRaises(Exception, any_model, UniqueCode, code='X')
+
+    def test_nulls_not_issued(self):
+        any_model(UniqueNullable, code__isnull=True)
+        any_model(UniqueNullable, code__isnull=True)
+        self.assertEqual(2, UniqueNullable.objects.filter(code__isnull=True).count())
@@ -0,0 +1,31 @@
+# -*- coding: utf-8; mode: django -*-
+"""
+Field validators limits are used as generation bounds
+"""
+from django.core.validators import MinValueValidator, MaxValueValidator, \
+    MinLengthValidator
+from django.db import models
+from django.test import TestCase
+from django_any import any_field
+
+
+class ValidatorBounds(TestCase):
+    def test_min_value_validator(self):
+        field = models.IntegerField(validators=[MinValueValidator(20000)])
+        for _ in xrange(0, 20):
+            self.assertTrue(any_field(field) >= 20000)
+
+    def test_value_interval_validators(self):
+        field = models.IntegerField(validators=[MinValueValidator(0),
+                                                MaxValueValidator(5)])
+        for _ in xrange(0, 20):
+            self.assertTrue(0 <= any_field(field) <= 5)
+
+    def test_min_length_validator(self):
+        field = models.CharField(max_length=10, validators=[MinLengthValidator(8)])
+        for _ in xrange(0, 20):
+            self.assertTrue(8 <= len(any_field(field)) <= 10)
+
+    def test_explicit_bounds_preferred(self):
+        field = models.IntegerField(validators=[MinValueValidator(0)])
+        self.assertEqual(3, any_field(field, min_value=3, max_value=3))
@@ -1,7 +1,8 @@
 # -*- coding: utf-8; mode: django -*-
+import random
 from django.db import models
 from django.test import TestCase
-from django_any import any_field
+from django_any import any_field, any_model
 from django_any.test import WithTestDataSeed, with_seed, without_random_seed
 
 
@@ -14,3 +15,25 @@ class CustomSeed(TestCase):
         media = models.CharField(max_length=25)
         result = any_field(media)
         self.assertEqual('SNnz', result)
+
+
+class SeedModel(models.Model):
+    name = models.CharField(max_length=25)
+    created = models.DateField()
+
+    class Meta:
+        app_label = 'django_any'
+
+
+class RandomStreams(TestCase):
+    def test_rng_argument(self):
+        media = models.CharField(max_length=25)
+        self.assertEqual('SNnz', any_field(media, rng=random.Random(1)))
+
+    def test_global_random_independent(self):
+        random.seed(1)
+        first = any_model.build(SeedModel, rng=random.Random(2))
+        random.random()
+        second = any_model.build(SeedModel, rng=random.Random(2))
+
+        self.assertEqual((first.name, first.created), (second.name, second.created))
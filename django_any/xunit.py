@@ -3,9 +3,128 @@
 The python basic types generators
 """
 import random
-from string import ascii_letters
+import sre_parse
+import threading
+from contextlib import contextmanager
+from bisect import bisect_right
+import sre_constants as sre
+from string import ascii_letters, digits, punctuation
 from datetime import date, datetime, timedelta
-from decimal import Decimal
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_streams = threading.local()
+
+
+def get_rng():
+    """
+    Returns random stream of the current thread. Stream is created
+    on first use, and is independent from the `random` module state
+    """
+    try:
+        return _streams.rng
+    except AttributeError:
+        _streams.rng = random.Random()
+        return _streams.rng
+
+
+def set_rng(rng):
+    """
+    Replaces random stream of the current thread, returns previous one
+    """
+    previous = get_rng()
+    _streams.rng = rng
+    return previous
+
+
+@contextmanager
+def rng_stream(rng):
+    """
+    Generates values from `rng` inside the with block
+
+    >>> with rng_stream(random.Random(1)):
+    ...     first = any_string()
+    >>> with rng_stream(random.Random(1)):
+    ...     second = any_string()
+    >>> first == second
+    True
+    """
+    previous = set_rng(rng)
+    try:
+        yield rng
+    finally:
+        set_rng(previous)
+
+
+def _numpy_random():
+    """
+    Returns numpy random generator seeded from the current
+    random stream, so batches are reproducible with the stream seed
+    """
+    return numpy.random.RandomState(get_rng().getrandbits(32))
+
+
+class WeightedSampler(object):
+    """
+    Samples item indexes by weights, with cumulative weights
+    table precomputed once, so each sample is O(log n)
+
+    >>> sampler = WeightedSampler([0, 1, 3])
+    >>> sampler.sample() in [1, 2]
+    True
+    >>> result = sampler.sample(5)
+    >>> len(result), all([index in [1, 2] for index in result])
+    (5, True)
+    """
+    def __init__(self, weights):
+        self.cumulative = []
+        total = 0
+        for weight in weights:
+            if weight < 0:
+                raise ValueError('Negative weight %s' % weight)
+            total += weight
+            self.cumulative.append(total)
+
+        if not total:
+            raise ValueError('At least one weight should be positive')
+        self.total = total
+        self.last = len(self.cumulative) - 1
+
+    def sample(self, count=None):
+        """
+        Returns one index, or list of `count` indexes
+        """
+        cumulative, total, last = self.cumulative, self.total, self.last
+
+        if count is None:
+            return min(bisect_right(cumulative, get_rng().random() * total), last)
+
+        if numpy is not None:
+            points = _numpy_random().random_sample(count) * total
+            indexes = numpy.searchsorted(cumulative, points, side='right')
+            return numpy.minimum(indexes, last).tolist()
+
+        rand = get_rng().random
+        return [min(bisect_right(cumulative, rand() * total), last) \
+                for _ in xrange(0, count)]
+
+
+_weighted_samplers = {}
+
+
+def _cached_sampler(key, weights):
+    try:
+        return _weighted_samplers[key]
+    except KeyError:
+        if len(_weighted_samplers) > 1000:
+            _weighted_samplers.clear()
+        return _weighted_samplers.setdefault(key, WeightedSampler(weights))
+
 
 def weighted_choice(choices):
     """
@@ -13,19 +132,24 @@ def weighted_choice(choices):
     where first one is the probability and second is the
     result object or callable
 
+    Samplers are cached by the weights, hot paths with large
+    tables could keep own WeightedSampler instead
+
     >>> result = weighted_choice([(20,'x'), (100, 'y')])
     >>> result in ['x', 'y']
     True
+    >>> table = [[1, 'x'], [0, 'y']]
+    >>> weighted_choice(table)
+    'x'
+    >>> table[0][0], table[1][0] = 0, 1
+    >>> weighted_choice(table)
+    'y'
     """
-    total = sum([weight for (weight, _) in choices])
-    i = random.randint(0, total - 1)
-    for weight, choice in choices:
-        i -= weight
-        if i < 0: 
-            if callable(choice):
-                return choice()
-            return choice
-    raise Exception('Bug')
+    weights = tuple([weight for (weight, _) in choices])
+    _, choice = choices[_cached_sampler(weights, weights).sample()]
+    if callable(choice):
+        return choice()
+    return choice
 
 
 def any_boolean():
@@ -36,7 +160,7 @@ def any_boolean():
     >>> type(result)
     <type 'bool'>
     """
-    return random.choice([True, False])
+    return get_rng().choice([True, False])
 
 
 def any_int(min_value=0, max_value=100, **kwargs):
@@ -50,7 +174,7 @@ def any_int(min_value=0, max_value=100, **kwargs):
     True
 
     """
-    return random.randint(min_value, max_value)
+    return get_rng().randint(min_value, max_value)
 
 
 def any_float(min_value=0, max_value=100, precision=2):
@@ -64,7 +188,7 @@ def any_float(min_value=0, max_value=100, precision=2):
     True
 
     """
-    return round(random.uniform(min_value, max_value), precision)
+    return round(get_rng().uniform(min_value, max_value), precision)
 
 
 def any_letter(letters = ascii_letters, **kwargs):
@@ -80,7 +204,7 @@ def any_letter(letters = ascii_letters, **kwargs):
     True
 
     """
-    return random.choice(letters)
+    return get_rng().choice(letters)
 
 
 def any_string(letters = ascii_letters, min_length=3, max_length=100):
@@ -96,9 +220,10 @@ def any_string(letters = ascii_letters, min_length=3, max_length=100):
     True
     """
     
-    length = random.randint(min_length, max_length)
-    letters = [any_letter(letters=letters) for _ in range(0, length)]
-    return "".join(letters)
+    rng = get_rng()
+    length = rng.randint(min_length, max_length)
+    choice = rng.choice
+    return "".join([choice(letters) for _ in xrange(0, length)])
 
 
 def any_date(from_date=date(1990, 1, 1), to_date=date.today()):
@@ -141,8 +266,379 @@ def any_decimal(min_value=Decimal(0), max_value=Decimal('99.99'), decimal_places
     <class 'decimal.Decimal'>
     >>> result >= Decimal('0.999') and result <= Decimal(3)
     True
+    >>> result = any_decimal(min_value=0, max_value=Decimal('9'*18 + '.99'), decimal_places=2)
+    >>> result.as_tuple().exponent
+    -2
+    """
+    low, high = _decimal_units(min_value, max_value, decimal_places)
+    return Decimal(get_rng().randint(low, high)).scaleb(-decimal_places)
+
+
+
+_decimal_bounds = {}
+
+
+def _decimal_units(min_value, max_value, decimal_places):
+    """
+    Returns [min_value, max_value] interval bounds as integer
+    counts of 10**-decimal_places units
+    """
+    key = (min_value, max_value, decimal_places)
+    try:
+        return _decimal_bounds[key]
+    except KeyError:
+        pass
+
+    quantum = Decimal(1).scaleb(-decimal_places)
+    low = (Decimal(str(min_value)) / quantum).to_integral_value(ROUND_CEILING)
+    high = (Decimal(str(max_value)) / quantum).to_integral_value(ROUND_FLOOR)
+
+    if len(_decimal_bounds) > 1000:
+        _decimal_bounds.clear()
+    return _decimal_bounds.setdefault(key, (int(low), int(high)))
+
+
+def max_decimal(max_digits, decimal_places):
+    """
+    Return maximal decimal with selected digits count
+
+    >>> max_decimal(5, 2)
+    Decimal('999.99')
+    """
+    key = ('max', max_digits, decimal_places)
+    try:
+        return _decimal_bounds[key]
+    except KeyError:
+        value = Decimal(10 ** max_digits - 1).scaleb(-decimal_places)
+        return _decimal_bounds.setdefault(key, value)
+
+
+def any_int_batch(count, min_value=0, max_value=100):
+    """
+    Return list of random integers from the selected range
+
+    >>> result = any_int_batch(10, min_value=0, max_value=100)
+    >>> type(result), len(result)
+    (<type 'list'>, 10)
+    >>> all([value in range(0, 101) for value in result])
+    True
+    """
+    if numpy is not None and max_value - min_value < 2**62:
+        values = _numpy_random().randint(min_value, max_value + 1, size=count)
+        return values.tolist()
+
+    randint = get_rng().randint
+    return [randint(min_value, max_value) for _ in xrange(0, count)]
+
+
+def any_string_batch(count, letters=ascii_letters, min_length=3, max_length=100):
+    """
+    Return list of strings with random content
+
+    >>> result = any_string_batch(10, letters=ascii_letters, min_length=3, max_length=5)
+    >>> len(result)
+    10
+    >>> all([len(value) in range(3, 6) for value in result])
+    True
+    >>> all([c in ascii_letters for value in result for c in value])
+    True
     """
-    return Decimal(str(any_float(min_value=float(min_value),
-                                 max_value=float(max_value),
-                                 precision=decimal_places)))
+    lengths = any_int_batch(count, min_value=min_length, max_value=max_length)
+    total = sum(lengths)
+
+    if numpy is not None:
+        indexes = _numpy_random().randint(0, len(letters), size=total)
+        content = "".join(numpy.array(list(letters))[indexes].tolist())
+    else:
+        choice = get_rng().choice
+        content = "".join([choice(letters) for _ in xrange(0, total)])
+
+    result, offset = [], 0
+    for length in lengths:
+        result.append(content[offset:offset + length])
+        offset += length
+    return result
 
+
+def any_date_batch(count, from_date=date(1990, 1, 1), to_date=date.today()):
+    """
+    Return list of random dates from the [from_date, to_date] interval
+
+    >>> result = any_date_batch(10, from_date=date(1990,1,1), to_date=date(1990,1,3))
+    >>> len(result)
+    10
+    >>> all([date(1990,1,1) <= value <= date(1990,1,3) for value in result])
+    True
+    """
+    days = any_int_batch(count, min_value=0, max_value=(to_date - from_date).days)
+    return [from_date + timedelta(days=day) for day in days]
+
+
+def any_decimal_batch(count, min_value=Decimal(0), max_value=Decimal('99.99'), decimal_places=2):
+    """
+    Return list of random decimals from the [min_value, max_value] interval
+
+    >>> result = any_decimal_batch(10, min_value=0.999, max_value=3, decimal_places=3)
+    >>> len(result)
+    10
+    >>> all([Decimal('0.999') <= value <= Decimal(3) for value in result])
+    True
+    >>> all([value.as_tuple().exponent == -3 for value in result])
+    True
+    """
+    low, high = _decimal_units(min_value, max_value, decimal_places)
+    units = any_int_batch(count, min_value=low, max_value=high)
+    return [Decimal(unit).scaleb(-decimal_places) for unit in units]
+
+
+REGEX_ALPHABET = ascii_letters + digits + punctuation + ' '
+
+_REGEX_CATEGORIES = {
+    sre.CATEGORY_DIGIT: digits,
+    sre.CATEGORY_WORD: ascii_letters + digits + '_',
+    sre.CATEGORY_SPACE: ' \t\n',
+}
+
+_REGEX_NOT_CATEGORIES = {
+    sre.CATEGORY_NOT_DIGIT: sre.CATEGORY_DIGIT,
+    sre.CATEGORY_NOT_WORD: sre.CATEGORY_WORD,
+    sre.CATEGORY_NOT_SPACE: sre.CATEGORY_SPACE,
+}
+
+_regex_samplers = {}
+
+# groups numbers are integers, so the key doesn't clash with them
+_SLACK = 'slack'
+
+
+def _regex_charset(items, char):
+    """
+    Returns string of all characters allowed by regex `[...]` items
+    """
+    allowed, negate = set(), False
+    for op, value in items:
+        if op == sre.NEGATE:
+            negate = True
+        elif op == sre.LITERAL:
+            allowed.add(char(value))
+        elif op == sre.RANGE:
+            allowed.update([char(code) for code in xrange(value[0], value[1] + 1)])
+        elif op == sre.CATEGORY and value in _REGEX_NOT_CATEGORIES:
+            allowed.update(set(REGEX_ALPHABET) -
+                           set(_REGEX_CATEGORIES[_REGEX_NOT_CATEGORIES[value]]))
+        elif op == sre.CATEGORY:
+            allowed.update(_REGEX_CATEGORIES.get(value, ''))
+
+    if negate:
+        allowed = set(REGEX_ALPHABET) - allowed
+    return "".join(sorted(allowed))
+
+
+def _regex_sampler(items, char, max_repeat, lengths):
+    """
+    Compiles parsed regex items to (sampler(groups), min_length) pair.
+
+    Samplers spend the groups[_SLACK] budget of characters allowed
+    above the pattern minimal length on extra repeats and longer branches
+    """
+    samplers, min_length = [], 0
+    for op, value in items:
+        length = 1
+        if op == sre.LITERAL:
+            samplers.append(lambda groups, result=char(value): result)
+        elif op in (sre.NOT_LITERAL, sre.ANY, sre.IN):
+            if op == sre.NOT_LITERAL:
+                letters = REGEX_ALPHABET.replace(char(value), '')
+            elif op == sre.ANY:
+                letters = REGEX_ALPHABET
+            else:
+                letters = _regex_charset(value, char)
+            samplers.append(lambda groups, letters=letters: get_rng().choice(letters))
+        elif op in (sre.MAX_REPEAT, sre.MIN_REPEAT):
+            min_count, max_count, subpattern = value
+            max_count = min(max_count, min_count + max_repeat)
+            sampler, sub_length = _regex_sampler(subpattern, char, max_repeat, lengths)
+            samplers.append(_regex_repeat_sampler(min_count, max_count, sampler, sub_length))
+            length = min_count * sub_length
+        elif op == sre.SUBPATTERN:
+            group, subpattern = value[0], value[-1]
+            sampler, length = _regex_sampler(subpattern, char, max_repeat, lengths)
+            samplers.append(_regex_group_sampler(group, sampler))
+            if group is not None:
+                lengths[group] = length
+        elif op == sre.BRANCH:
+            branches = [_regex_sampler(branch, char, max_repeat, lengths) \
+                        for branch in value[1]]
+            length = min([branch_length for _, branch_length in branches])
+            samplers.append(_regex_branch_sampler(branches, length))
+        elif op == sre.GROUPREF:
+            samplers.append(lambda groups, group=value: groups.get(group, ''))
+            length = lengths.get(value, 0)
+        elif op in (sre.ASSERT, sre.ASSERT_NOT):
+            raise TypeError('Lookaround assertions are not supported')
+        else:
+            # anchors produce no characters
+            length = 0
+        min_length += length
+
+    return lambda groups: "".join([sampler(groups) for sampler in samplers]), min_length
+
+
+def _regex_repeat_sampler(low, high, sampler, length):
+    def _sampler(groups):
+        extra = high - low
+        if length:
+            extra = min(extra, groups[_SLACK] // length)
+        count = low + get_rng().randint(0, extra)
+        groups[_SLACK] -= (count - low) * length
+        return "".join([sampler(groups) for _ in xrange(0, count)])
+    return _sampler
+
+
+def _regex_branch_sampler(branches, length):
+    def _sampler(groups):
+        sampler, branch_length = get_rng().choice(
+            [branch for branch in branches if branch[1] - length <= groups[_SLACK]])
+        groups[_SLACK] -= branch_length - length
+        return sampler(groups)
+    return _sampler
+
+
+def _regex_group_sampler(group, sampler):
+    def _sampler(groups):
+        result = sampler(groups)
+        if group is not None:
+            groups[group] = result
+        return result
+    return _sampler
+
+
+def _compiled_regex(regex, max_repeat):
+    """
+    Returns cached (sampler, min_length) pair for the regex,
+    raises TypeError for not supported regex
+    """
+    pattern = getattr(regex, 'pattern', regex)
+    flags = getattr(regex, 'flags', 0)
+    key = (pattern, flags, max_repeat)
+
+    try:
+        compiled = _regex_samplers[key]
+    except KeyError:
+        char = unichr if isinstance(pattern, unicode) else chr
+        try:
+            compiled = _regex_sampler(sre_parse.parse(pattern, flags), char, max_repeat, {})
+        except TypeError, e:
+            compiled = e
+        _regex_samplers[key] = compiled
+
+    if isinstance(compiled, TypeError):
+        raise compiled
+    return compiled
+
+
+def regex_supported(regex):
+    """
+    Returns True if strings matching the regex could be generated
+
+    >>> regex_supported(r'^\d{3}$'), regex_supported(r'^(?!0)\d{3}$'), regex_supported(None)
+    (True, False, False)
+    """
+    if regex is None:
+        return False
+    try:
+        _compiled_regex(regex, 10)
+    except TypeError:
+        return False
+    return True
+
+
+def any_regex_string(regex, max_repeat=10, max_length=None):
+    """
+    Return random string matching the regex. Regex is parsed once,
+    unlimited repeats are limited by max_repeat, and the string
+    is not longer than max_length, if the regex allows it.
+    Back references are not counted in max_length. Lookaround
+    assertions are not supported, TypeError is raised for them
+
+    >>> import re
+    >>> result = any_regex_string(r'^[A-Z]{3}-\d{2,4}(x|y)\\1$')
+    >>> re.match(r'^[A-Z]{3}-\d{2,4}(x|y)\\1$', result) is not None
+    True
+    >>> result = any_regex_string(re.compile(r'^\+?\d+ \(\d{3}\) [^\s]+$'))
+    >>> re.match(r'^\+?\d+ \(\d{3}\) [^\s]+$', result) is not None
+    True
+    >>> len(any_regex_string(r'^\w+(-\w+)*$', max_repeat=100, max_length=8)) <= 8
+    True
+    >>> any_regex_string(re.compile(r'a b  c', re.VERBOSE))
+    'abc'
+    """
+    sampler, min_length = _compiled_regex(regex, max_repeat)
+
+    slack = float('inf')
+    if max_length is not None:
+        slack = max(max_length - min_length, 0)
+    return sampler({_SLACK: slack})
+
+
+def distribution_sampler(size, distribution):
+    """
+    Returns WeightedSampler for `size` items, or None for
+    uniform distribution.
+
+    Distribution could be 'uniform', 'zipf', ('zipf', exponent)
+    or explicit sequence of weights
+    """
+    if distribution is None or distribution == 'uniform':
+        return None
+
+    if isinstance(distribution, basestring):
+        distribution = (distribution,)
+
+    if distribution[0] == 'zipf':
+        key = (size, tuple(distribution))
+        try:
+            return _weighted_samplers[key]
+        except KeyError:
+            exponent = distribution[1] if len(distribution) > 1 else 1.0
+            return _cached_sampler(key, [1.0 / rank ** exponent \
+                                         for rank in xrange(1, size + 1)])
+    elif isinstance(distribution[0], basestring):
+        raise TypeError('Unknown distribution %s' % distribution[0])
+
+    if len(distribution) != size:
+        raise TypeError('%d weights expected, not %d' % (size, len(distribution)))
+    return _cached_sampler((size, tuple(distribution)), distribution)
+
+
+def any_index(size, distribution=None):
+    """
+    Return random index of `size` items, selected by distribution
+
+    >>> result = any_index(10, distribution='zipf')
+    >>> result in range(0, 10)
+    True
+    >>> any_index(3, distribution=[0, 0, 1])
+    2
+    """
+    sampler = distribution_sampler(size, distribution)
+    if sampler is None:
+        return get_rng().randint(0, size - 1)
+    return sampler.sample()
+
+
+def any_index_batch(count, size, distribution=None):
+    """
+    Return list of random indexes of `size` items, selected
+    by distribution
+
+    >>> result = any_index_batch(100, 10, distribution=('zipf', 1.2))
+    >>> len(result), all([index in range(0, 10) for index in result])
+    (100, True)
+    >>> any_index_batch(3, 3, distribution=[0, 1, 0])
+    [1, 1, 1]
+    """
+    sampler = distribution_sampler(size, distribution)
+    if sampler is None:
+        return any_int_batch(count, min_value=0, max_value=size - 1)
+    return sampler.sample(count)
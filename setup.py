@@ -8,7 +8,8 @@ setup(
     author_email='kmmbvnr@gmail.com',
     url='http://github.com/kmmbvnr/django-any',
     keywords = "django",
-    packages=['django_any', 'django_any.contrib', 'django_any.tests'],
+    packages=['django_any', 'django_any.contrib', 'django_any.management',
+              'django_any.management.commands', 'django_any.tests'],
     include_package_data=True,
     zip_safe=False,
     license='MIT License',